@@ -1,5 +1,9 @@
-import json
 import sys
+if '--profile-startup' in sys.argv:
+    # before the other imports so they show up in the report
+    from core import startup_profile
+    startup_profile.enable()
+import json
 import logging
 import ctypes
 import os
@@ -9,24 +13,15 @@ from datetime import datetime
 from pathlib import Path
 import threading
 import time
-import tkinter
-from tkinter import ttk
-import tkinter.font as tkfont
-import tkinter.messagebox as messagebox
-from tkinter import scrolledtext
-import cv2
-import numpy as np
-import pyautogui
-
-from pynput import keyboard, mouse
-from pynput.keyboard import Controller as KeyBoardController, KeyCode, Key
-from pynput.mouse import Button, Controller as MouseController
-from core.actions import parse_action_line as action_parse_line, compose_action_line as action_compose_line, extract_meta as action_extract_meta
+# cv2/numpy/pyautogui/pynput and Tk are imported where they are first used (see warm_up_imports)
+from core.actions import compose_action_line as action_compose_line, extract_meta as action_extract_meta
+from core import action_binary
+from core import action_index
 from core.replayer import Replayer
-from core.recorder import Recorder
+from core.recorder import Recorder, CoalesceOptions
 from core.utils import get_screen_size
 from core import settings as settings_mod
-from controllers.monitor import MonitorThread
+from controllers.monitor import make_monitor
 from controllers.recording import RecordingController
 from controllers.playback import PlaybackController
 from controllers.hotkeys import HotkeyController
@@ -228,13 +223,14 @@ class RuleEngine:
                 cfg = getattr(self.runner.state, 'monitor_image_config', {}) or {}
                 target = cfg.get('target'); interval = float(cfg.get('interval', 2.0) or 2.0)
                 if target and os.path.exists(target):
-                    self.runner.state.monitor_image_thread = MonitorThread(
+                    self.runner.state.monitor_image_thread = make_monitor(
                         target_path=target,
                         timeout_s=1e9,
                         interval_s=interval,
                         stop_callbacks=[],
                         restart_callback=None,
-                        hit_callback=lambda: self.event_hub.emit('monitor_image_hit', rule=cfg)
+                        hit_callback=lambda: self.event_hub.emit('monitor_image_hit', rule=cfg),
+                        options=cfg
                     )
                     self.runner.state.monitor_image_thread.start()
                     self.runner.state.monitor_image_suppress_until = time.time() + 1.0
@@ -266,13 +262,14 @@ class RuleEngine:
                 cfg = getattr(self.runner.state, 'monitor_image_config', {}) or {}
                 target = cfg.get('target'); interval = float(cfg.get('interval', 2.0) or 2.0)
                 if target and os.path.exists(target):
-                    self.runner.state.monitor_image_thread = MonitorThread(
+                    self.runner.state.monitor_image_thread = make_monitor(
                         target_path=target,
                         timeout_s=1e9,
                         interval_s=interval,
                         stop_callbacks=[],
                         restart_callback=None,
-                        hit_callback=lambda: self.event_hub.emit('monitor_image_hit', rule=cfg)
+                        hit_callback=lambda: self.event_hub.emit('monitor_image_hit', rule=cfg),
+                        options=cfg
                     )
                     self.runner.state.monitor_image_thread.start()
                     self.runner.state.monitor_image_suppress_until = time.time() + 1.0
@@ -386,6 +383,7 @@ class AppState:
     restart_back_job: object = None
     restart_running: bool = False
     current_recorder: Recorder = None
+    record_coalesce: CoalesceOptions = None
     current_replayer: Replayer = None
     current_run_idx: int = 0
     current_run_action: str = ''
@@ -416,6 +414,7 @@ class UIRefs:
     playback_controller: object
     listen_controller: object
     execute_controller: object
+    recordBinaryVar: object = None
 
 # Simple UI state enum for readability
 class UiState:
@@ -522,9 +521,9 @@ class AppService:
         return sel_path if os.path.exists(sel_path) else name
 
     def _ensure_execute_controller(self):
-        if self.execute_controller and self.execute_controller.is_alive():
+        if self.execute_controller and self.execute_controller.attach():
             return self.execute_controller
-        # if existing but dead, discard and create new
+        # if existing but dead or already exiting, discard and create new
         if callable(self._execute_controller_factory):
             self.execute_controller = self._execute_controller_factory()
             try:
@@ -618,13 +617,14 @@ class AppService:
                                     self.state.monitor_image_thread.stop()
                             except Exception:
                                 pass
-                            self.state.monitor_image_thread = MonitorThread(
+                            self.state.monitor_image_thread = make_monitor(
                                 target_path=target,
                                 timeout_s=1e9,
                                 interval_s=interval,
                                 stop_callbacks=[],
                                 restart_callback=None,
-                                hit_callback=lambda: self.event_hub.emit('monitor_image_hit', rule=img_rule)
+                                hit_callback=lambda: self.event_hub.emit('monitor_image_hit', rule=img_rule),
+                                options=img_rule
                             )
                             self.state.monitor_image_thread.start()
                             if callable(self._log):
@@ -785,7 +785,7 @@ class ActionRunner:
                     timeout_s = max(1.0, float(state.restart_timeout_ms)/1000.0)
                 except Exception:
                     timeout_s = 3600.0
-                state.monitor_thread = MonitorThread(
+                state.monitor_thread = make_monitor(
                     target_path=monitor_img,
                     timeout_s=timeout_s,
                     interval_s=3,
@@ -810,6 +810,7 @@ class ActionRunner:
             rel_auto = bool(params.get('rel_auto', True))
         except Exception:
             rel_auto = True
+        prev_replayer = state.current_replayer
         if self.playback_controller:
             try:
                 self.playback_controller.start(
@@ -819,30 +820,35 @@ class ActionRunner:
                     use_rel=use_rel,
                     rel_gain=rel_gain,
                     rel_auto=rel_auto,
-                    total_ms=total_ms
+                    total_ms=total_ms,
+                    streaming=params.get('streaming'),
+                    scheduler=params.get('scheduler'),
+                    backend=params.get('backend')
                 )
             except Exception:
                 pass
-        # watcher to emit replay_done on natural completion (finite runs only)
+        ctrl = None
+        try:
+            ctrl = self.execute_controller_supplier() if callable(self.execute_controller_supplier) else None
+            if ctrl and not ctrl.is_alive():
+                ctrl.start()
+        except Exception:
+            pass
+        # only the replayer started above; a stale finished one would end the waits below at once
+        replayer = state.current_replayer if state.current_replayer is not prev_replayer else None
+        # without an ExecuteController (which emits on completion), emit replay_done when the
+        # replayer fires its completion signal (finite runs only)
         try:
-            if not params.get('infinite') and state.current_replayer:
+            if not params.get('infinite') and replayer and not ctrl:
                 def _watch():
-                    try:
-                        state.current_replayer.join()
-                    except Exception:
+                    replayer.wait()
+                    if self._run_token != my_token:
                         return
                     try:
                         self.event_hub.emit('replay_done', action=state.action_file_name)
                     except Exception:
                         pass
-                t = threading.Thread(target=_watch, daemon=True)
-                t.start()
-        except Exception:
-            pass
-        try:
-            ctrl = self.execute_controller_supplier() if callable(self.execute_controller_supplier) else None
-            if ctrl and not ctrl.is_alive():
-                ctrl.start()
+                threading.Thread(target=_watch, daemon=True).start()
         except Exception:
             pass
         state.can_start_listening = False
@@ -855,7 +861,10 @@ class ActionRunner:
         if not params.get('infinite'):
             duration_s = max(1.0, (total_ms/1000.0) * max(1, repeat) + 1.0)
             def _watch():
-                time.sleep(duration_s)
+                if replayer is not None and replayer.wait(duration_s):
+                    return  # completed; replay_done came from the completion path
+                if replayer is None:
+                    time.sleep(duration_s)
                 if self._run_token != my_token:
                     return
                 try:
@@ -1010,7 +1019,7 @@ class ActionRunner:
                     timeout_s = max(1.0, float(self.state.restart_timeout_ms)/1000.0)
                 except Exception:
                     timeout_s = 3600.0
-                self.state.monitor_thread = MonitorThread(
+                self.state.monitor_thread = make_monitor(
                     target_path=monitor_img,
                     timeout_s=timeout_s,
                     interval_s=3,
@@ -1048,7 +1057,7 @@ class ActionRunner:
             except Exception:
                 pass
         try:
-            if self.execute_controller and self.execute_controller.is_alive():
+            if self.execute_controller and self.execute_controller.attach():
                 pass
             else:
                 self.execute_controller = ExecuteController(self.state, ui_refs, command_adapter, self.release_all_inputs)
@@ -1129,6 +1138,7 @@ def relaunch_as_admin_if_needed():
 def release_all_inputs():
     # Release any keys/buttons that might have been left pressed
     try:
+        from pynput.keyboard import Controller as KeyBoardController, KeyCode
         kb = KeyBoardController()
         for vk in list(state.pressed_vks):
             try:
@@ -1139,6 +1149,22 @@ def release_all_inputs():
     except Exception:
         pass
 
+# imported in the background once the window is up, so the first record/replay/monitor does not stall
+WARMUP_MODULES = ('numpy', 'cv2', 'pyautogui', 'pynput.keyboard', 'pynput.mouse', 'core.matching', 'core.template_cache', 'core.input_backend')
+
+
+def warm_up_imports(modules=WARMUP_MODULES):
+    def _run():
+        import importlib
+        for name in modules:
+            try:
+                importlib.import_module(name)
+            except Exception:
+                pass
+    t = threading.Thread(target=_run, name='warmup', daemon=True)
+    t.start()
+    return t
+
 def ensure_actions_dir():
     p = Path('actions')
     p.mkdir(parents=True, exist_ok=True)
@@ -1147,24 +1173,36 @@ def ensure_actions_dir():
 def list_action_files():
     # Prefer files under actions/; include .action and .rule
     actions_dir = ensure_actions_dir()
-    files = sorted(str(f.name) for f in actions_dir.glob('*.action')) + sorted(str(f.name) for f in actions_dir.glob('*.rule'))
+    files = sorted(str(f.name) for f in actions_dir.glob('*.action')) + sorted(str(f.name) for f in actions_dir.glob('*' + action_binary.BINARY_EXT)) + sorted(str(f.name) for f in actions_dir.glob('*.rule'))
     if files:
         return files
-    root_files = sorted(glob.glob('*.action')) + sorted(glob.glob('*.rule'))
+    root_files = sorted(glob.glob('*.action')) + sorted(glob.glob('*' + action_binary.BINARY_EXT)) + sorted(glob.glob('*.rule'))
     return root_files
 
 def init_new_action_file():
     # Create a new action file with timestamp-based name and header/meta
     ts = datetime.now().strftime('%Y%m%d-%H%M%S')
     actions_dir = ensure_actions_dir()
-    state.action_file_name = str(actions_dir / f"{ts}.action")
+    try:
+        binary = bool(ui_refs.recordBinaryVar.get()) if ui_refs is not None and ui_refs.recordBinaryVar is not None else bool(load_settings().get('record_binary'))
+    except Exception:
+        binary = False
+    ext = action_binary.BINARY_EXT if binary else '.action'
+    state.action_file_name = str(actions_dir / f"{ts}{ext}")
     sw, sh = get_screen_size()
     state.record_start_time = time.time()
+    header = ['# QuickMacro action v1', f"META SCREEN {sw} {sh}", f"META START {ts}"]
+    # capture-time coalescing is recorded in the header so replay/editing can see what was applied
+    state.record_coalesce = CoalesceOptions.from_settings(load_settings() or {})
+    if state.record_coalesce.enabled:
+        header.append(state.record_coalesce.meta_line())
     try:
-        with open(state.action_file_name, 'w', encoding='utf-8') as f:
-            f.write('# QuickMacro action v1\n')
-            f.write(f"META SCREEN {sw} {sh}\n")
-            f.write(f"META START {ts}\n")
+        if binary:
+            with open(state.action_file_name, 'wb') as f:
+                action_binary.write_header(f, header)
+        else:
+            with open(state.action_file_name, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(header) + '\n')
     except Exception:
         pass
 
@@ -1182,6 +1220,7 @@ def ensure_assets_dir():
                 '- bg.png   : window background (PNG)\n'
                 '- icon.png : window icon (PNG)\n'
                 '- monitor_target.png : image to detect (template matching)\n'
+                '- monitor_target.json : optional settings for it, e.g. {"region": [0.75, 0.0, 0.25, 0.25]}\n'
                 'Replace these with your own cute/moe assets.\n',
                 encoding='utf-8'
             )
@@ -1209,20 +1248,7 @@ def load_rules(path: str = RULES_PATH) -> dict:
 
 def compute_action_total_ms(path: str) -> int:
     try:
-        total_ms = 0
-        with open(path, 'r', encoding='utf-8') as f:
-            for line in f:
-                s = line.strip()
-                if not s or s.startswith('#'):
-                    continue
-                d = action_parse_line(s)
-                try:
-                    t_ms = int(float(d.get('ms') or 0))
-                except Exception:
-                    t_ms = 0
-                if t_ms > 0:
-                    total_ms = max(total_ms, t_ms)
-        return total_ms
+        return int(action_index.get_action_meta(path).get('duration_ms') or 0)
     except Exception:
         return 0
 
@@ -1239,22 +1265,9 @@ def get_restart_timeout_ms(path: str) -> int:
     if not path:
         return default_ms
     try:
-        with open(path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
+        restart_ms = action_index.get_action_meta(path).get('restart')
     except Exception:
         return default_ms
-    restart_ms = None
-    for line in lines:
-        s = line.strip()
-        if not s.startswith('META RESTART'):
-            continue
-        parts = s.split()
-        if len(parts) >= 3:
-            try:
-                restart_ms = int(float(parts[2]))
-            except Exception:
-                restart_ms = None
-        break
     if restart_ms is None:
         restart_ms = default_ms
     try:
@@ -1270,7 +1283,8 @@ def get_restart_timeout_ms(path: str) -> int:
 def save_settings():
     if ui_refs is None:
         return
-    data = {}
+    # start from the stored file so settings without a UI control are kept
+    data = dict(load_settings() or {})
     try:
         data['play_count'] = int(ui_refs.playCount.get())
     except Exception:
@@ -1299,6 +1313,10 @@ def save_settings():
         data['game_mode_auto'] = bool(ui_refs.gameModeAutoVar.get())
     except Exception:
         pass
+    try:
+        data['record_binary'] = bool(ui_refs.recordBinaryVar.get())
+    except Exception:
+        pass
     settings_mod.save_settings(data, SETTINGS_PATH)
 
 def apply_settings_to_ui(settings: dict):
@@ -1324,6 +1342,11 @@ def apply_settings_to_ui(settings: dict):
             ui_refs.gameModeAutoVar.set(bool(settings.get('game_mode_auto', True)))
     except Exception:
         pass
+    try:
+        if 'record_binary' in settings and ui_refs.recordBinaryVar is not None:
+            ui_refs.recordBinaryVar.set(bool(settings.get('record_binary', False)))
+    except Exception:
+        pass
 # Sync the Combobox to point at the current recording file
 def select_current_action_in_dropdown():
     if ui_refs is None:
@@ -1394,5 +1417,10 @@ def command_adapter(action):
 ######################################################################
 if __name__ == '__main__':
     import sys
-    from ui.app import run_app
+    import multiprocessing
+    multiprocessing.freeze_support()
+    from core import startup_profile
+    startup_profile.mark('QuickMacro imported')
+    with startup_profile.phase('import ui.app'):
+        from ui.app import run_app
     run_app(sys.modules[__name__])
@@ -0,0 +1,272 @@
+"""Image monitor throughput/latency benchmark.
+
+Stands in for pyautogui.screenshot with a local frame source (synthetic scenes, or
+a directory of PNG backgrounds) that pastes the template at known positions, so
+MonitorThread can be tuned without a live game screen. For each resolution,
+template size and matching strategy it reports capture, conversion and match
+time plus false hits/misses; a live run through CaptureService then measures
+detection latency (template appears -> hit callback).
+
+    python -m bench.monitor_matching [--png-dir shots/] [--template t.png] [--out result.json]
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from controllers.capture import capture_service
+from controllers.monitor import MonitorThread
+
+
+# name -> MonitorThread options
+STRATEGIES = {
+    'full': {'change_block': 0, 'local_pad': 0, 'adaptive': False},
+    'pyramid-0.5': {'pyramid_scale': 0.5, 'change_block': 0, 'local_pad': 0, 'adaptive': False},
+    'gated': {'local_pad': 0, 'adaptive': False},
+    'last-hit': {'change_block': 0, 'adaptive': False},
+    'combined': {'pyramid_scale': 0.5, 'adaptive': False},
+}
+# frames per template placement; the template moves or disappears between segments
+SEGMENT = 10
+CURSOR = 24
+
+
+def _pct(vals, p):
+    if not vals:
+        return 0.0
+    vals = sorted(vals)
+    return vals[min(len(vals) - 1, int(round(p / 100.0 * (len(vals) - 1))))]
+
+
+class FrameSource:
+    """RGB scenes with the template at known positions and a moving cursor-sized box.
+
+    The cursor stays in a strip along the bottom edge, the template above it, so the
+    ground truth never depends on the two overlapping.
+    """
+
+    def __init__(self, width, height, template_rgb, backgrounds=None, seed=0, present=0.6):
+        self.width, self.height = width, height
+        self.template = template_rgb
+        self.rng = np.random.default_rng(seed)
+        self.present = present
+        if backgrounds:
+            self.backgrounds = [cv2.resize(b, (width, height), interpolation=cv2.INTER_AREA) for b in backgrounds]
+        else:
+            self.backgrounds = [self._synthetic_background()]
+        self._segments = {}
+        self.live_pos = None
+        self.live_since = 0.0
+
+    def _synthetic_background(self):
+        w, h = self.width, self.height
+        gx = np.linspace(0, 255, w, dtype=np.float32)[None, :]
+        gy = np.linspace(0, 255, h, dtype=np.float32)[:, None]
+        img = np.dstack([(gx * 0.6 + gy * 0.4), (gx * 0.3 + gy * 0.7), np.broadcast_to(255 - gx * 0.5, (h, w))]).astype(np.uint8)
+        for _ in range(40):
+            x, y = int(self.rng.integers(0, w)), int(self.rng.integers(0, h))
+            cv2.rectangle(img, (x, y), (x + int(self.rng.integers(20, w // 4)), y + int(self.rng.integers(10, h // 6))),
+                          tuple(int(c) for c in self.rng.integers(0, 255, 3)), -1)
+        return np.ascontiguousarray(img)
+
+    def _placement(self):
+        th, tw = self.template.shape[:2]
+        if self.rng.random() >= self.present:
+            return None
+        return (int(self.rng.integers(0, self.width - tw)), int(self.rng.integers(0, self.height - th - CURSOR * 2)))
+
+    def _compose(self, pos, bg_index, cursor_x):
+        img = self.backgrounds[bg_index % len(self.backgrounds)].copy()
+        if pos is not None:
+            th, tw = self.template.shape[:2]
+            img[pos[1]:pos[1] + th, pos[0]:pos[0] + tw] = self.template
+        cy = self.height - CURSOR - 4
+        cx = cursor_x % max(1, self.width - CURSOR)
+        img[cy:cy + CURSOR, cx:cx + CURSOR] = 255 - img[cy:cy + CURSOR, cx:cx + CURSOR]
+        return img
+
+    def frame(self, i):
+        """(RGB frame, template top-left or None) for frame number i."""
+        seg = i // SEGMENT
+        if seg not in self._segments:
+            self._segments[seg] = self._placement()
+        pos = self._segments[seg]
+        return self._compose(pos, seg, i * 7), pos
+
+    # live mode: the scene changes on a wall-clock schedule
+    def shuffle_live(self):
+        self.live_pos = self._placement()
+        self.live_since = time.monotonic()
+
+    def grab(self, box):
+        """CaptureService grab (grayscale) of the current live scene."""
+        img = self._compose(self.live_pos, 0, int(time.monotonic() * 500))
+        if box is not None:
+            x, y, w, h = box
+            img = img[y:y + h, x:x + w]
+        return cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+
+
+def _template_rgb(size, seed=1):
+    rng = np.random.default_rng(seed)
+    # blocky noise keeps the template distinctive at pyramid scales
+    small = rng.integers(0, 255, (max(2, size // 4), max(2, size // 4), 3), dtype=np.uint8)
+    return cv2.resize(small, (size, size), interpolation=cv2.INTER_NEAREST)
+
+
+def _monitor(tmpl_path, options, interval_s=0.1, hit_callback=None):
+    return MonitorThread(tmpl_path, 1e9, interval_s, hit_callback=hit_callback, options=dict(options))
+
+
+def run_offline(source, tmpl_path, strategy, frames):
+    m = _monitor(tmpl_path, STRATEGIES[strategy])
+    cap, conv, match = [], [], []
+    false_hits = misses = 0
+    for i in range(frames):
+        t0 = time.perf_counter()
+        rgb, truth = source.frame(i)
+        rgb = np.ascontiguousarray(rgb)
+        t1 = time.perf_counter()
+        gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+        gray.setflags(write=False)
+        t2 = time.perf_counter()
+        hit = m._check(gray)
+        t3 = time.perf_counter()
+        cap.append((t1 - t0) * 1000.0)
+        conv.append((t2 - t1) * 1000.0)
+        match.append((t3 - t2) * 1000.0)
+        if hit and truth is None:
+            false_hits += 1
+        elif truth is not None and not hit:
+            misses += 1
+    return {
+        'capture_ms': {'p50': _pct(cap, 50), 'p95': _pct(cap, 95)},
+        'convert_ms': {'p50': _pct(conv, 50), 'p95': _pct(conv, 95)},
+        'match_ms': {'mean': sum(match) / len(match), 'p50': _pct(match, 50), 'p95': _pct(match, 95), 'max': max(match)},
+        'frames': frames,
+        'false_hits': false_hits,
+        'misses': misses,
+        'gate_stats': dict(m.gate_stats),
+        'matcher_stats': dict(m._matcher.stats) if m._matcher is not None else {},
+    }
+
+
+class _LiveGrab:
+    """Grab for the process-wide CaptureService; forwards to whichever source is live."""
+    source = None
+
+    def __call__(self, box):
+        return self.source.grab(box)
+
+
+_live = _LiveGrab()
+
+
+def run_live(source, tmpl_path, strategy, seconds, interval_s):
+    """Detection latency through the shared CaptureService; the scene changes every 0.5-1.5 s."""
+    hits = []
+    _live.source = source
+    service = capture_service(_live)
+    frames0 = service.frames
+    m = _monitor(tmpl_path, STRATEGIES[strategy], interval_s, hit_callback=lambda: hits.append(time.monotonic()))
+    source.shuffle_live()
+    m.start()
+    latencies, missed = [], 0
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        shown_at, pos = source.live_since, source.live_pos
+        time.sleep(0.5 + source.rng.random())
+        if pos is not None:
+            first = [t for t in hits if t >= shown_at]
+            if first:
+                latencies.append((first[0] - shown_at) * 1000.0)
+            else:
+                missed += 1
+        source.shuffle_live()
+    m.stop()
+    m.join(2.0)
+    return {
+        'interval_s': interval_s,
+        'appearances': len(latencies) + missed,
+        'missed': missed,
+        'latency_ms': {'p50': _pct(latencies, 50), 'p95': _pct(latencies, 95), 'max': max(latencies) if latencies else 0.0},
+        'frames': service.frames - frames0,
+    }
+
+
+def _load_pngs(path):
+    out = []
+    for p in sorted(glob.glob(os.path.join(path, '*.png'))):
+        img = cv2.imread(p, cv2.IMREAD_COLOR)
+        if img is not None:
+            out.append(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+    return out
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--resolutions', default='1280x720,1920x1080,2560x1440')
+    ap.add_argument('--template-sizes', default='32,64,128', help='square synthetic template sides in px')
+    ap.add_argument('--template', default='', help='use this PNG as the template instead of synthetic ones')
+    ap.add_argument('--png-dir', default='', help='directory of PNG backgrounds (default: synthetic scenes)')
+    ap.add_argument('--strategies', default=','.join(STRATEGIES), help='comma separated: ' + ', '.join(STRATEGIES))
+    ap.add_argument('--frames', type=int, default=40)
+    ap.add_argument('--live-seconds', type=float, default=5.0, help='latency run per strategy (0 skips)')
+    ap.add_argument('--interval', type=float, default=0.1, help='monitor interval for the latency run')
+    ap.add_argument('--out', default='', help='write JSON here as well as stdout')
+    args = ap.parse_args(argv)
+    resolutions = [tuple(int(v) for v in r.lower().split('x')) for r in args.resolutions.split(',') if 'x' in r]
+    strategies = [s.strip() for s in args.strategies.split(',') if s.strip() in STRATEGIES]
+    backgrounds = _load_pngs(args.png_dir) if args.png_dir else None
+    if args.template:
+        templates = [cv2.cvtColor(cv2.imread(args.template, cv2.IMREAD_COLOR), cv2.COLOR_BGR2RGB)]
+    else:
+        templates = [_template_rgb(int(s)) for s in args.template_sizes.split(',') if s.strip()]
+    results = []
+    print(f"{'resolution':<11} {'template':<9} {'strategy':<12} {'capture':>8} {'convert':>8} {'match p50':>10} "
+          f"{'p95':>8} {'false':>6} {'miss':>5} {'latency p50':>12} {'p95':>8}", file=sys.stderr)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for tmpl in templates:
+            th, tw = tmpl.shape[:2]
+            tmpl_path = os.path.join(tmpdir, f'template_{tw}x{th}.png')
+            cv2.imwrite(tmpl_path, cv2.cvtColor(tmpl, cv2.COLOR_RGB2BGR))
+            for w, h in resolutions:
+                for s in strategies:
+                    r = {'resolution': f'{w}x{h}', 'template': f'{tw}x{th}', 'strategy': s}
+                    r.update(run_offline(FrameSource(w, h, tmpl, backgrounds), tmpl_path, s, args.frames))
+                    if args.live_seconds > 0:
+                        r['live'] = run_live(FrameSource(w, h, tmpl, backgrounds, seed=2), tmpl_path, s, args.live_seconds, args.interval)
+                    lat = r.get('live', {}).get('latency_ms', {})
+                    print(f"{r['resolution']:<11} {r['template']:<9} {s:<12} {r['capture_ms']['p50']:>7.2f}m {r['convert_ms']['p50']:>7.2f}m "
+                          f"{r['match_ms']['p50']:>9.2f}m {r['match_ms']['p95']:>7.2f}m {r['false_hits']:>6} {r['misses']:>5} "
+                          f"{lat.get('p50', 0.0):>11.1f}m {lat.get('p95', 0.0):>7.1f}m", file=sys.stderr)
+                    results.append(r)
+    report = {
+        'benchmark': 'monitor_matching',
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'opencv': cv2.__version__,
+        'frames': args.frames,
+        'live_seconds': args.live_seconds,
+        'source': 'png-dir' if backgrounds else 'synthetic',
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""Replay timing accuracy benchmark.
+
+Replays synthetic and/or real action files through Replayer (null input backend
+by default, so it runs headless), timestamping every dispatched event, for each
+scheduler setting, and reports lateness percentiles, drift across loops and events/s.
+
+    python -m bench.replay_timing [files ...] [--loops 3] [--seconds 10] [--out result.json]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from core.input_backend import InputBackend, NullBackend, make_backend
+from core.replayer import Replayer
+from core.scheduler import HybridScheduler, SleepScheduler
+from core.timeline import Timeline
+
+
+# name -> factory; each run gets a fresh scheduler
+CONFIGS = {
+    'hybrid-spin': lambda: HybridScheduler(spin=True),
+    'hybrid-sleep': lambda: HybridScheduler(spin=False),
+    'sleep-10ms': lambda: SleepScheduler(quantum=0.01),
+    'sleep-1ms': lambda: SleepScheduler(quantum=0.001),
+}
+
+
+class _StampBackend(NullBackend):
+    """Null backend that records (loop, seconds since loop start) for every dispatched event."""
+
+    def __init__(self):
+        self.replayer = None  # set once the Replayer exists; provides loop_start_ts
+        self.samples = []
+        self.loop_starts = []
+
+    def _stamp(self, *args):
+        now = time.monotonic()
+        start = self.replayer.loop_start_ts
+        if not self.loop_starts or self.loop_starts[-1] != start:
+            self.loop_starts.append(start)
+        self.samples.append((len(self.loop_starts) - 1, now - start))
+
+    # one backend call per replayed event
+    press = release = move = move_rel = scroll = _stamp
+
+    def click_at(self, btn, down, x, y):
+        self._stamp()
+
+
+class _WrappedBackend(InputBackend):
+    """Stamps each event, then forwards it to a real backend."""
+
+    def __init__(self, stamp, inner):
+        self.stamp = stamp
+        self.inner = inner
+        self.tick = inner.tick
+
+    def press(self, vk):
+        self.stamp._stamp(); self.inner.press(vk)
+
+    def release(self, vk):
+        self.stamp._stamp(); self.inner.release(vk)
+
+    def move(self, x, y):
+        self.stamp._stamp(); self.inner.move(x, y)
+
+    def move_rel(self, dx, dy):
+        self.stamp._stamp(); self.inner.move_rel(dx, dy)
+
+    def click_at(self, btn, down, x, y):
+        self.stamp._stamp(); self.inner.click_at(btn, down, x, y)
+
+    def scroll(self, dx, dy):
+        self.stamp._stamp(); self.inner.scroll(dx, dy)
+
+    def flush(self):
+        self.inner.flush()
+
+    def close(self):
+        self.inner.close()
+
+
+def _pct(vals, p):
+    if not vals:
+        return 0.0
+    return vals[min(len(vals) - 1, int(round(p / 100.0 * (len(vals) - 1))))]
+
+
+def synthetic(kind: str, seconds: float, path: str) -> str:
+    lines = ['# QuickMacro action v1', 'META SCREEN 1920 1080']
+    end_ms = int(seconds * 1000)
+    if kind == 'moves':
+        # 1 kHz mouse path
+        for t in range(0, end_ms):
+            lines.append(f"M MOVE {t % 1920} {(t // 3) % 1080} {t}")
+    else:
+        # 125 Hz path with a click and a key tap every 250 ms
+        for t in range(0, end_ms, 8):
+            lines.append(f"M MOVE {t % 1920} {(t // 3) % 1080} {t}")
+            if t % 250 < 8:
+                lines.append(f"M CLICK left DOWN {t % 1920} {(t // 3) % 1080} {t + 1}")
+                lines.append(f"M CLICK left UP {t % 1920} {(t // 3) % 1080} {t + 3}")
+                lines.append(f"K DOWN 65 {t + 2}")
+                lines.append(f"K UP 65 {t + 4}")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    return path
+
+
+def _truncated(path: str, seconds: float, tmpdir: str) -> str:
+    """First `seconds` of a real recording, so long files stay benchmarkable."""
+    tl = Timeline.from_path(path).sorted()
+    limit = int(seconds * 1000)
+    n = sum(1 for v in tl.t if v <= limit)
+    if n == len(tl):
+        return path
+    out = os.path.join(tmpdir, os.path.basename(path))
+    tl[:n].save(out)
+    return out
+
+
+def run_one(path: str, config: str, loops: int, backend: str = 'null') -> dict:
+    tl = Timeline.from_path(path).sorted()
+    t_ms = list(tl.t)
+    duration_ms = tl.duration_ms
+    stop_kb, stop_ms, infinite = threading.Event(), threading.Event(), threading.Event()
+    stamp = _StampBackend()
+    bk = stamp if backend == 'null' else _WrappedBackend(stamp, make_backend(backend))
+    rep = Replayer(path, stop_kb, stop_ms, infinite, loops, scheduler=CONFIGS[config](), streaming=False, backend=bk)
+    stamp.replayer = rep
+    wall0 = time.monotonic()
+    rep.start()
+    rep._runner.join()
+    wall = time.monotonic() - wall0
+    # samples are in event order per loop; pair them with the recorded timestamps
+    late = []
+    per_loop = {}
+    for loop, rel in stamp.samples:
+        i = per_loop.get(loop, 0)
+        per_loop[loop] = i + 1
+        if i < len(t_ms):
+            late.append(rel * 1000.0 - t_ms[i])
+    # each loop restarts its clock when the previous one ends, so overrun accumulates
+    overrun = []
+    starts = stamp.loop_starts
+    for i in range(1, len(starts)):
+        overrun.append((starts[i] - starts[i - 1]) * 1000.0 - duration_ms)
+    drift, acc = [], 0.0
+    for v in overrun:
+        acc += v
+        drift.append(round(acc, 3))
+    late_sorted = sorted(late)
+    return {
+        'file': os.path.basename(path),
+        'config': config,
+        'backend': backend,
+        'events': len(t_ms),
+        'duration_ms': duration_ms,
+        'loops': loops,
+        'lateness_ms': {
+            'mean': (sum(late) / len(late)) if late else 0.0,
+            'p50': _pct(late_sorted, 50),
+            'p95': _pct(late_sorted, 95),
+            'p99': _pct(late_sorted, 99),
+            'max': late_sorted[-1] if late_sorted else 0.0,
+        },
+        'loop_overrun_ms': [round(v, 3) for v in overrun],
+        'drift_ms': drift,
+        'events_per_s': (len(late) / wall) if wall > 0 else 0.0,
+        'scheduler_stats': rep.timing_stats(),
+    }
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('files', nargs='*', help='.action/.actionb files (default: synthetic only)')
+    ap.add_argument('--loops', type=int, default=3)
+    ap.add_argument('--seconds', type=float, default=5.0, help='synthetic length / cap for real files')
+    ap.add_argument('--configs', default=','.join(CONFIGS), help='comma separated: ' + ', '.join(CONFIGS))
+    ap.add_argument('--backend', default='null', help="input backend, e.g. null, pynput, batching:null")
+    ap.add_argument('--no-synthetic', action='store_true')
+    ap.add_argument('--out', default='', help='write JSON here as well as stdout')
+    args = ap.parse_args(argv)
+    configs = [c.strip() for c in args.configs.split(',') if c.strip() in CONFIGS]
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = []
+        if not args.no_synthetic:
+            paths.append(synthetic('moves', args.seconds, os.path.join(tmpdir, 'synthetic-moves.action')))
+            paths.append(synthetic('mixed', args.seconds, os.path.join(tmpdir, 'synthetic-mixed.action')))
+        for p in args.files:
+            paths.append(_truncated(p, args.seconds, tmpdir))
+        for p in paths:
+            for c in configs:
+                r = run_one(p, c, args.loops, args.backend)
+                lm = r['lateness_ms']
+                print(f"{r['file']:<28} {c:<13} p50 {lm['p50']:.3f}  p95 {lm['p95']:.3f}  p99 {lm['p99']:.3f}  "
+                      f"max {lm['max']:.3f} ms  drift {r['drift_ms'][-1] if r['drift_ms'] else 0.0:.1f} ms  "
+                      f"{r['events_per_s']:.0f} ev/s", file=sys.stderr)
+                results.append(r)
+    report = {
+        'benchmark': 'replay_timing',
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'loops': args.loops,
+        'backend': args.backend,
+        'seconds': args.seconds,
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+﻿import threading
+import time
+from core.utils import get_screen_size
+
+# subscribers due within this window share the current frame instead of forcing another grab
+DUE_SLACK_S = 0.02
+
+def resolve_region(region, screen_wh):
+    """[x, y, w, h] -> absolute (x, y, w, h) clamped to the screen, or None for full screen.
+
+    All values in 0..1 (with at least one float) are read as fractions of the screen size.
+    """
+    try:
+        if not region or len(region) != 4:
+            return None
+        sw, sh = screen_wh
+        vals = [float(v) for v in region]
+        if all(0.0 <= v <= 1.0 for v in vals) and any(isinstance(v, float) for v in region):
+            vals = [vals[0] * sw, vals[1] * sh, vals[2] * sw, vals[3] * sh]
+        x, y, w, h = (int(round(v)) for v in vals)
+        x = max(0, min(x, sw - 1)); y = max(0, min(y, sh - 1))
+        w = max(1, min(w, sw - x)); h = max(1, min(h, sh - y))
+        return x, y, w, h
+    except Exception:
+        return None
+
+
+def pyautogui_grab(box):
+    """Grayscale uint8 frame of box (x, y, w, h) or of the whole screen when box is None."""
+    import cv2
+    import numpy as np
+    import pyautogui
+    shot = pyautogui.screenshot(region=box) if box is not None else pyautogui.screenshot()
+    return cv2.cvtColor(np.array(shot), cv2.COLOR_RGB2GRAY)
+
+
+class CaptureService(threading.Thread):
+    """One capture loop shared by every image matcher.
+
+    Subscribers provide `interval_s`, `capture_box()` -> (x, y, w, h) or None and
+    `on_frame(frame, origin)`. Each tick grabs a single grayscale frame covering the
+    boxes of all subscribers that are due and hands each of them a read-only view of
+    its own box, so capture/convert cost does not grow with the number of rules.
+    """
+
+    def __init__(self, grab=None):
+        super().__init__()
+        self.daemon = True
+        self.grab = grab or pyautogui_grab
+        self._lock = threading.Lock()
+        self._subs = {}  # subscriber -> next due (monotonic)
+        self._wake = threading.Event()
+        self._stop_ev = threading.Event()
+        self.frames = 0
+        self.last_capture_s = 0.0
+
+    def register(self, sub):
+        with self._lock:
+            self._subs[sub] = time.monotonic()
+        self._wake.set()
+
+    def unregister(self, sub):
+        with self._lock:
+            self._subs.pop(sub, None)
+        self._wake.set()
+
+    def stop(self):
+        self._stop_ev.set()
+        self._wake.set()
+
+    def _due(self):
+        now = time.monotonic()
+        with self._lock:
+            if not self._subs:
+                return [], None
+            due = [s for s, t in self._subs.items() if t <= now + DUE_SLACK_S]
+            nxt = min(self._subs.values())
+        return due, max(0.0, nxt - now - DUE_SLACK_S)
+
+    def _tick(self, due):
+        boxes = []
+        full = False
+        for s in due:
+            try:
+                b = s.capture_box()
+            except Exception:
+                b = None
+            boxes.append(b)
+            full = full or b is None
+        if full:
+            sw, sh = get_screen_size()
+            union = (0, 0, sw, sh)
+        else:
+            x0 = min(b[0] for b in boxes); y0 = min(b[1] for b in boxes)
+            x1 = max(b[0] + b[2] for b in boxes); y1 = max(b[1] + b[3] for b in boxes)
+            union = (x0, y0, x1 - x0, y1 - y0)
+        t0 = time.perf_counter()
+        frame = self.grab(None if full else union)
+        self.last_capture_s = time.perf_counter() - t0
+        self.frames += 1
+        frame.setflags(write=False)
+        fh, fw = frame.shape[:2]
+        for s, b in zip(due, boxes):
+            if b is None:
+                view, origin = frame, (union[0], union[1])
+            else:
+                x, y = b[0] - union[0], b[1] - union[1]
+                view, origin = frame[y:min(fh, y + b[3]), x:min(fw, x + b[2])], (b[0], b[1])
+            try:
+                s.on_frame(view, origin)
+            except Exception:
+                pass
+
+    def run(self):
+        while not self._stop_ev.is_set():
+            due, wait_s = self._due()
+            if not due:
+                self._wake.wait(wait_s)
+                self._wake.clear()
+                continue
+            try:
+                self._tick(due)
+            except Exception:
+                pass
+            now = time.monotonic()
+            with self._lock:
+                for s in due:
+                    if s in self._subs:
+                        self._subs[s] = now + max(0.01, float(getattr(s, 'interval_s', 1.0) or 1.0))
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def capture_service(grab=None) -> CaptureService:
+    """Process-wide capture loop, started on first use (`grab` only applies then)."""
+    global _service
+    with _service_lock:
+        if _service is None or not _service.is_alive():
+            _service = CaptureService(grab)
+            _service.start()
+        return _service
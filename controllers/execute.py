@@ -1,7 +1,6 @@
 import threading
 import time
 import os
-from pynput import keyboard
 
 
 def _safe_set(ev):
@@ -20,14 +19,36 @@ class ExecuteController(threading.Thread):
         self.command_adapter = command_adapter
         self.release_all_inputs = release_all_inputs
         self.on_finished = on_finished
+        # guards the exit decision in run() against attach() from the thread starting a replay
+        self._lock = threading.Lock()
+        self._exiting = False
 
-    def run(self):
-        keyboardListener = keyboard.Listener(on_release=lambda key: None)
-        keyboardListener.start()
+    def attach(self) -> bool:
+        """Called after a new replayer was installed: True if this running controller will
+        handle it, False if it is not running or already past its last check (start a new one)."""
+        with self._lock:
+            return self.is_alive() and not self._exiting
 
-        while not (self.state.ev_stop_execute_keyboard.is_set() and self.state.ev_stop_execute_mouse.is_set()):
-            time.sleep(0.05)
+    def run(self):
+        # The replayer fires its completion signal after it has set both stop events. A stop from
+        # elsewhere sets the events, which wakes the replayer, so waiting on it covers both cases.
+        # A replay started while this thread is still alive (the restart/resume chain, rule
+        # sequences) reuses it, so keep going until the current replayer has been handled.
+        handled = ()
+        while True:
+            with self._lock:
+                rep = self.state.current_replayer
+                if rep is handled:
+                    self._exiting = True
+                    break
+            if rep is not None:
+                rep.wait()
+                if self.state.current_replayer is not rep:
+                    continue
+            handled = rep
+            self._replay_finished()
 
+    def _replay_finished(self):
         try:
             if callable(self.release_all_inputs):
                 self.release_all_inputs()
@@ -130,4 +151,3 @@ class ExecuteController(threading.Thread):
                 self.on_finished()
         except Exception:
             pass
-        keyboardListener.stop()
@@ -1,6 +1,5 @@
 ﻿import time
 import threading
-from pynput import keyboard
 
 class HotkeyController(threading.Thread):
     def __init__(self, state, root, on_toggle_record, on_toggle_replay):
@@ -12,6 +11,7 @@ class HotkeyController(threading.Thread):
         self.on_toggle_replay = on_toggle_replay
 
     def run(self):
+        from pynput import keyboard
         last_f10 = 0.0
         last_f11 = 0.0
 
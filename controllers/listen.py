@@ -1,6 +1,5 @@
 ﻿import threading
 import time
-from pynput import keyboard
 
 def _safe_set(ev):
     try:
@@ -17,6 +16,7 @@ class ListenController(threading.Thread):
         self.on_escape = on_escape
 
     def run(self):
+        from pynput import keyboard
         try:
             self.state.ev_stop_listen.clear()
         except Exception:
@@ -1,67 +1,271 @@
-﻿import threading
+﻿import json
+import os
+import threading
 import time
-import cv2
-import numpy as np
-import pyautogui
+from core.utils import get_screen_size
+from controllers.capture import capture_service, resolve_region
+
+# when the changed area needs this much of the frame searched anyway, match the whole frame
+FULL_MATCH_FRACTION = 0.5
+
+
+def load_target_options(target_path: str) -> dict:
+    """Optional per-image settings from a JSON sidecar, e.g. assets/monitor_target.json."""
+    try:
+        side = os.path.splitext(target_path)[0] + '.json'
+        if os.path.exists(side):
+            with open(side, 'r', encoding='utf-8') as f:
+                data = json.load(f) or {}
+            return data if isinstance(data, dict) else {}
+    except Exception:
+        pass
+    return {}
+
+
+class AdaptiveInterval:
+    """Polling interval that follows how soon the next hit is expected.
+
+    Right after a hit it polls at max_s; as the time since the last hit nears the
+    typical gap between hits (or the restart timeout when no gap is known yet) it
+    speeds up to min_s. If frames arrive late or a check eats a large share of the
+    interval, the result is stretched by a backoff factor (up to MAX_BACKOFF).
+    """
+
+    MAX_BACKOFF = 4.0
+    # a check taking more than this share of the interval counts as contention
+    BUSY_SHARE = 0.25
+    LATE_S = 0.1
+
+    def __init__(self, base_s: float, min_s: float, max_s: float, timeout_s: float = 0.0):
+        self.base_s = float(base_s)
+        self.min_s = max(0.01, float(min_s))
+        self.max_s = max(self.min_s, float(max_s))
+        self.timeout_s = float(timeout_s or 0.0)
+        self.typical_gap_s = None
+        self.backoff = 1.0
+        self.current_s = min(self.max_s, max(self.min_s, self.base_s))
+        self._in_hit = False
+        self._episode_ts = None
+
+    def observe(self, now: float, hit: bool, cost_s: float, late_s: float):
+        if hit and not self._in_hit:
+            # a new hit episode (not the same target still being on screen)
+            if self._episode_ts is not None:
+                gap = now - self._episode_ts
+                self.typical_gap_s = gap if self.typical_gap_s is None else 0.7 * self.typical_gap_s + 0.3 * gap
+            self._episode_ts = now
+        self._in_hit = hit
+        if late_s > self.LATE_S or cost_s > self.BUSY_SHARE * self.current_s:
+            self.backoff = min(self.MAX_BACKOFF, self.backoff * 1.5)
+        else:
+            self.backoff = max(1.0, self.backoff * 0.8)
+
+    def next(self, now: float, last_hit: float) -> float:
+        expected = self.typical_gap_s
+        if expected is None and 0.0 < self.timeout_s < 1e8:
+            expected = self.timeout_s
+        if expected is None:
+            base = self.base_s
+        else:
+            # poll about four times over what is left of the expected gap
+            base = (expected - (now - last_hit)) / 4.0
+        self.current_s = min(self.max_s * self.MAX_BACKOFF, max(self.min_s, min(self.max_s, base)) * self.backoff)
+        return self.current_s
+
 
 class MonitorThread(threading.Thread):
-    def __init__(self, target_path: str, timeout_s: float, interval_s: float, stop_callbacks=None, restart_callback=None, hit_callback=None):
+    def __init__(self, target_path: str, timeout_s: float, interval_s: float, stop_callbacks=None, restart_callback=None, hit_callback=None, region=None, options=None):
         super().__init__()
         self.daemon = True
         self.target_path = target_path
         self.timeout_s = timeout_s
         self.interval_s = interval_s
+        self.base_interval_s = interval_s
         self.stop_callbacks = stop_callbacks or []
         self.restart_callback = restart_callback
         self._stop_ev = threading.Event()
-        self._tmpl = self._load_template(target_path)
+        self._wake = threading.Event()
+        self._hit_pending = False
+        self.last_hit = 0.0
         self.hit_callback = hit_callback
+        # per-monitor options: the image's sidecar JSON, overridden by the rule entry
+        self.options = dict(load_target_options(target_path))
+        self.options.update(options or {})
+        self.region = region if region is not None else self.options.get('region')
+        self._template_entry = None
+        self._tmpl = None
+        self._matcher = None
+        self._gate = None
+        self._last_loc = None
+        self.gate_stats = {'skipped': 0, 'partial': 0, 'full': 0}
+        self._poll = None
+        self._next_frame_ts = None
+        self._enabled = self._setup_matching()
+
+    def _setup_matching(self) -> bool:
+        """Template, matcher, change gate and adaptive poll; False if the template cannot be read."""
+        # OpenCV/numpy are only imported once a monitor is actually created
+        from core.matching import ChangeDetector, TemplateMatcher, DEFAULT_THRESHOLD
+        self._tmpl = self._load_template(self.target_path)
+        if self._tmpl is None:
+            return False
+        try:
+            self._matcher = TemplateMatcher(
+                self._template_entry,
+                threshold=float(self.options.get('threshold', DEFAULT_THRESHOLD)),
+                pyramid_scale=float(self.options.get('pyramid_scale', 1.0) or 1.0),
+                local_pad=int(self.options.get('local_pad', 8)),
+            )
+        except Exception:
+            self._matcher = TemplateMatcher(self._tmpl)
+        # frame-change gating; "change_block": 0 turns it off
+        try:
+            block = int(self.options.get('change_block', 16) or 0)
+            if block > 0:
+                self._gate = ChangeDetector(block, int(self.options.get('change_threshold', 4)))
+        except Exception:
+            self._gate = None
+        # adaptive polling; "adaptive": false keeps the fixed interval
+        try:
+            if self.options.get('adaptive', True):
+                self._poll = AdaptiveInterval(
+                    self.base_interval_s,
+                    float(self.options.get('min_interval', min(self.base_interval_s, 0.5))),
+                    float(self.options.get('max_interval', self.base_interval_s)),
+                    self.timeout_s,
+                )
+        except Exception:
+            self._poll = None
+        return True
 
     def _load_template(self, path):
         try:
-            img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
-            return img
+            from core.template_cache import template_cache
+            self._template_entry = template_cache().get(path)
+            return self._template_entry.gray if self._template_entry is not None else None
         except Exception:
             return None
 
     def stop(self):
         try:
             self._stop_ev.set()
+            self._wake.set()
         except Exception:
             pass
 
+    # capture service subscriber
+    def capture_box(self):
+        """Search region on screen (None = full screen)."""
+        box = resolve_region(self.region, get_screen_size())
+        if box is not None:
+            th, tw = self._tmpl.shape[:2]
+            # never capture less than the template itself
+            if box[2] < tw or box[3] < th:
+                box = None
+        return box
+
+    def _check(self, frame) -> bool:
+        """Is the template on screen? Only re-matches where the frame changed."""
+        m = self._matcher
+        gate = self._gate
+        if gate is None:
+            return m.hit(frame)
+        rects = gate.dirty(frame)
+        if rects is not None and not rects:
+            # nothing changed: same answer as last time
+            self.gate_stats['skipped'] += 1
+            return self._last_loc is not None
+        wins = m.windows(frame, rects) if rects else None
+        if wins is not None and sum(w * h for _, _, w, h in wins) >= FULL_MATCH_FRACTION * frame.shape[0] * frame.shape[1]:
+            wins = None
+        if wins is None:
+            self.gate_stats['full'] += 1
+            score, loc = m.match(frame)
+        else:
+            self.gate_stats['partial'] += 1
+            last = self._last_loc
+            if last is not None and not any(
+                    x < last[0] + m.tw and last[0] < x + w and y < last[1] + m.th and last[1] < y + h
+                    for x, y, w, h in rects):
+                # the previous match is outside every changed block, so it is still there
+                return True
+            score, loc = m.match_in(frame, wins)
+        self._last_loc = loc if score >= m.threshold else None
+        return self._last_loc is not None
+
+    def on_frame(self, frame, origin):
+        """Runs on the capture thread; callbacks are left to this monitor's own thread."""
+        t0 = time.monotonic()
+        hit = self._check(frame)
+        now = time.monotonic()
+        if hit:
+            self.last_hit = now
+            self._hit_pending = True
+            self._wake.set()
+        if self._poll is not None:
+            late = 0.0 if self._next_frame_ts is None else max(0.0, t0 - self._next_frame_ts)
+            self._poll.observe(now, hit, now - t0, late)
+            # the capture service reads interval_s right after this to schedule the next frame
+            self.interval_s = self._poll.next(now, self.last_hit)
+            self._next_frame_ts = now + self.interval_s
+
+    def _attach(self):
+        capture_service().register(self)
+
+    def _detach(self):
+        capture_service().unregister(self)
+
+    def remote_hit(self):
+        """Hit reported from outside the capture loop (see controllers.monitor_process)."""
+        self.last_hit = time.monotonic()
+        self._hit_pending = True
+        self._wake.set()
+
     def run(self):
-        if self._tmpl is None:
+        if not self._enabled:
             return
-        last_hit = time.monotonic()
-        while not self._stop_ev.is_set():
-            if (time.monotonic() - last_hit) >= self.timeout_s:
-                for cb in self.stop_callbacks:
+        self.last_hit = time.monotonic()
+        self._attach()
+        try:
+            while not self._stop_ev.is_set():
+                remaining = self.timeout_s - (time.monotonic() - self.last_hit)
+                if remaining <= 0:
+                    for cb in self.stop_callbacks:
+                        try:
+                            cb()
+                        except Exception:
+                            pass
                     try:
-                        cb()
+                        if callable(self.restart_callback):
+                            self.restart_callback()
                     except Exception:
                         pass
-                try:
-                    if callable(self.restart_callback):
-                        self.restart_callback()
-                except Exception:
-                    pass
-                last_hit = time.monotonic()
-            try:
-                shot = pyautogui.screenshot()
-                shot = cv2.cvtColor(np.array(shot), cv2.COLOR_RGB2GRAY)
-                res = cv2.matchTemplate(shot, self._tmpl, cv2.TM_CCOEFF_NORMED)
-                _, max_val, _, _ = cv2.minMaxLoc(res)
-                if max_val >= 0.8:
-                    last_hit = time.monotonic()
+                    self.last_hit = time.monotonic()
+                    continue
+                # monitor_image watchers use timeout_s=1e9, beyond TIMEOUT_MAX on Windows
+                self._wake.wait(min(remaining, threading.TIMEOUT_MAX))
+                self._wake.clear()
+                if self._hit_pending:
+                    self._hit_pending = False
                     if callable(self.hit_callback):
                         try:
                             self.hit_callback()
                         except Exception:
                             pass
-            except Exception:
-                pass
-            try:
-                self._stop_ev.wait(self.interval_s)
-            except Exception:
-                pass
+        finally:
+            self._detach()
+
+
+def make_monitor(target_path: str, timeout_s: float, interval_s: float, stop_callbacks=None, restart_callback=None, hit_callback=None, region=None, options=None):
+    """MonitorThread, or a ProcessMonitor when the rule/sidecar sets "process": true."""
+    merged = dict(load_target_options(target_path))
+    merged.update(options or {})
+    cls = MonitorThread
+    if merged.get('process'):
+        try:
+            from controllers.monitor_process import ProcessMonitor
+            cls = ProcessMonitor
+        except Exception:
+            cls = MonitorThread
+    return cls(target_path, timeout_s, interval_s, stop_callbacks=stop_callbacks, restart_callback=restart_callback,
+               hit_callback=hit_callback, region=region, options=options)
@@ -0,0 +1,173 @@
+﻿"""Image monitoring in a separate worker process.
+
+Screen capture, grayscale conversion and template matching are CPU heavy and, in
+the app process, compete with the Replayer thread and Tk for the GIL. With
+"process": true in a monitor_image rule (or an image's sidecar JSON) the monitor
+is a ProcessMonitor instead: a single worker process loads the templates and runs
+the capture loop and matchers for all such monitors, and reports hits and
+effective intervals back over a pipe. The app side only keeps the timeout/restart
+handling and the callbacks (which emit to the EventHub); it never captures a frame
+or loads the template. If the worker dies it is restarted and the live monitors
+are re-added.
+"""
+import atexit
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import threading
+
+from controllers.monitor import MonitorThread
+
+logger = logging.getLogger(__name__)
+
+RESTART_DELAY_S = 1.0
+STATUS_INTERVAL_S = 0.5
+
+
+def _worker_main(conn):
+    monitors = {}
+    reported = {}
+    send_lock = threading.Lock()
+
+    def send(msg):
+        with send_lock:
+            conn.send(msg)
+
+    try:
+        while True:
+            if conn.poll(STATUS_INTERVAL_S):
+                cmd = conn.recv()
+                if cmd[0] == 'add':
+                    _, mid, target_path, interval_s, region, options = cmd
+                    m = MonitorThread(target_path, 1e9, interval_s, region=region, options=options,
+                                      hit_callback=lambda mid=mid: send(('hit', mid)))
+                    monitors[mid] = m
+                    m.start()
+                elif cmd[0] == 'remove':
+                    m = monitors.pop(cmd[1], None)
+                    reported.pop(cmd[1], None)
+                    if m is not None:
+                        m.stop()
+                elif cmd[0] == 'stop':
+                    break
+            for mid, m in list(monitors.items()):
+                if reported.get(mid) != m.interval_s:
+                    reported[mid] = m.interval_s
+                    send(('interval', mid, m.interval_s))
+    except (EOFError, OSError):
+        pass  # app process went away
+    finally:
+        for m in monitors.values():
+            m.stop()
+
+
+class MonitorHost:
+    """Owns the worker process and the command/result pipe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._monitors = {}
+        self._ids = itertools.count(1)
+        self._ctx = mp.get_context('spawn')
+        self._proc = None
+        self._conn = None
+        self._stopped = False
+        self.restarts = 0
+        self._spawn()
+        atexit.register(self.stop)
+
+    def _spawn(self):
+        parent, child = self._ctx.Pipe()
+        proc = self._ctx.Process(target=_worker_main, args=(child,), daemon=True, name='QuickMacroMonitor')
+        proc.start()
+        child.close()
+        self._proc, self._conn = proc, parent
+        for mid, m in list(self._monitors.items()):
+            self._send(('add', mid, m.target_path, m.base_interval_s, m.region, m.options))
+        threading.Thread(target=self._read, args=(parent,), daemon=True).start()
+
+    def _send(self, msg):
+        try:
+            self._conn.send(msg)
+        except Exception:
+            pass  # the reader notices the dead worker and restarts it
+
+    def _read(self, conn):
+        while True:
+            try:
+                msg = conn.recv()
+            except (EOFError, OSError):
+                break
+            m = self._monitors.get(msg[1])
+            if m is None:
+                continue
+            if msg[0] == 'hit':
+                m.remote_hit()
+            elif msg[0] == 'interval':
+                m.interval_s = msg[2]
+        with self._lock:
+            if self._stopped or conn is not self._conn:
+                return
+            proc = self._proc
+        proc.join(RESTART_DELAY_S)
+        logger.warning('monitor worker exited (code %s); restarting', proc.exitcode)
+        with self._lock:
+            if not self._stopped and conn is self._conn:
+                self.restarts += 1
+                self._spawn()
+
+    def add(self, monitor) -> int:
+        with self._lock:
+            mid = next(self._ids)
+            self._monitors[mid] = monitor
+            self._send(('add', mid, monitor.target_path, monitor.base_interval_s, monitor.region, monitor.options))
+            return mid
+
+    def remove(self, mid) -> None:
+        with self._lock:
+            if self._monitors.pop(mid, None) is not None:
+                self._send(('remove', mid))
+
+    def is_alive(self) -> bool:
+        return self._proc is not None and self._proc.is_alive()
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._send(('stop',))
+        try:
+            self._proc.join(2.0)
+            if self._proc.is_alive():
+                self._proc.terminate()
+        except Exception:
+            pass
+
+
+_host = None
+_host_lock = threading.Lock()
+
+
+def monitor_host() -> MonitorHost:
+    """Process-wide worker host, started on first use."""
+    global _host
+    with _host_lock:
+        if _host is None or _host._stopped:
+            _host = MonitorHost()
+        return _host
+
+
+class ProcessMonitor(MonitorThread):
+    """MonitorThread whose template, capture and matching live in the worker process."""
+
+    def _setup_matching(self) -> bool:
+        # the worker loads the template and builds the matcher; here only check it exists
+        return os.path.isfile(self.target_path)
+
+    def _attach(self):
+        self._mid = monitor_host().add(self)
+
+    def _detach(self):
+        monitor_host().remove(self._mid)
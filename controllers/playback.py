@@ -13,7 +13,7 @@ class PlaybackController:
         self.on_started = on_started
         self.on_stopped = on_stopped
 
-    def start(self, path, repeat_count, infinite=False, use_rel=False, rel_gain=1.0, rel_auto=True, total_ms=0):
+    def start(self, path, repeat_count, infinite=False, use_rel=False, rel_gain=1.0, rel_auto=True, total_ms=0, streaming=None, scheduler=None, backend=None):
         if not (self.state.can_start_listening and self.state.can_start_executing):
             if callable(self.logger):
                 self.logger("Skip start replay (busy)")
@@ -43,7 +43,7 @@ class PlaybackController:
             pass
         self.update_ui_for_state('replaying')
         try:
-            self.state.current_replayer = Replayer(path, self.state.ev_stop_execute_keyboard, self.state.ev_stop_execute_mouse, self.state.ev_infinite_replay, repeat_count, use_rel, rel_gain, rel_auto, self.on_progress, self.on_loop_start)
+            self.state.current_replayer = Replayer(path, self.state.ev_stop_execute_keyboard, self.state.ev_stop_execute_mouse, self.state.ev_infinite_replay, repeat_count, use_rel, rel_gain, rel_auto, self.on_progress, self.on_loop_start, streaming=streaming, scheduler=scheduler, backend=backend)
             self.state.current_replayer.start()
         except Exception:
             pass
@@ -22,7 +22,7 @@ class RecordingController:
             pass
         self.update_ui_for_state('recording')
         try:
-            self.state.current_recorder = Recorder(self.state.action_file_name, self.state.ev_stop_listen)
+            self.state.current_recorder = Recorder(self.state.action_file_name, self.state.ev_stop_listen, coalesce=getattr(self.state, 'record_coalesce', None))
             self.state.current_recorder.start()
         except Exception:
             pass
@@ -35,6 +35,8 @@ class RecordingController:
 
     def stop(self):
         try:
+            if self.state.current_recorder:
+                self.state.current_recorder.stop()
             self.state.ev_stop_listen.set()
         except Exception:
             pass
@@ -0,0 +1,372 @@
+"""Binary .action format (QMAB).
+
+Layout (little-endian):
+  header : magic b'QMAB', u16 version, u16 flags, u32 meta_len, then meta_len bytes of
+           UTF-8 text holding the non-event lines (comment header and META lines)
+  blocks : u32 n, u32 size, payload, u32 size, u32 n
+           payload is n-long columns op(u8) btn(u8) flags(u8) x(i32) y(i32)
+           nx(f32) ny(f32) t(u32). With HDR_ZLIB the x/y/t columns are delta coded
+           and the payload is zlib-compressed. The trailing size/n let the last
+           block be read from the end of the file.
+
+Key events keep the vk in x, scroll events keep dx/dy in x/y.
+"""
+import os
+import struct
+import sys
+import zlib
+from array import array
+from itertools import accumulate
+from typing import Dict, List, Optional, Tuple
+
+
+MAGIC = b'QMAB'
+VERSION = 1
+BINARY_EXT = '.actionb'
+BLOCK_SIZE = 4096
+
+# header flags
+HDR_ZLIB = 1
+
+OP_KEY_DOWN = 1
+OP_KEY_UP = 2
+OP_MOVE = 3
+OP_CLICK_DOWN = 4
+OP_CLICK_UP = 5
+OP_SCROLL = 6
+
+BTN_NONE = 0
+BTN_LEFT = 1
+BTN_RIGHT = 2
+
+# per-record flags
+FLAG_NORM = 1
+
+_HEAD = struct.Struct('<4sHHI')
+_BLOCK = struct.Struct('<II')
+# (name, array typecode) in on-disk order
+COLUMNS = (
+    ('op', 'B'), ('btn', 'B'), ('flags', 'B'),
+    ('x', 'i'), ('y', 'i'), ('nx', 'f'), ('ny', 'f'), ('t', 'I'),
+)
+_DELTA_COLS = ('x', 'y', 't')
+RECORD_SIZE = sum(array(tc).itemsize for _, tc in COLUMNS)
+_SWAP = sys.byteorder != 'little'
+
+
+def new_columns() -> Dict[str, array]:
+    return {name: array(tc) for name, tc in COLUMNS}
+
+
+def is_binary_action(path: str) -> bool:
+    try:
+        with open(path, 'rb') as f:
+            return f.read(4) == MAGIC
+    except Exception:
+        return False
+
+
+def _to_int(v) -> int:
+    try:
+        return int(v or 0)
+    except Exception:
+        try:
+            return int(float(v))
+        except Exception:
+            return 0
+
+
+def _norm_pair(a: str, b: str):
+    try:
+        return FLAG_NORM, float(a), float(b)
+    except Exception:
+        return 0, 0.0, 0.0
+
+
+def encode_line(s: str) -> Optional[Tuple]:
+    """Text event line -> record without building the parse_action_line() dict.
+
+    Field positions follow parse_action_line(); returns None for META/comments/garbage.
+    """
+    parts = s.split()
+    n = len(parts)
+    if n < 2:
+        return None
+    kind = parts[0]
+    if kind == 'K':
+        op = OP_KEY_DOWN if parts[1] == 'DOWN' else (OP_KEY_UP if parts[1] == 'UP' else 0)
+        if not op:
+            return None
+        t = _to_int(parts[-1]) if n > 3 else 0
+        return (op, BTN_NONE, 0, _to_int(parts[2] if n > 2 else 0), 0, 0.0, 0.0, max(0, min(0x7FFFFFFF, t)))
+    if kind != 'M':
+        return None
+    sub = parts[1]
+    flags = 0
+    nx = ny = 0.0
+    if sub == 'MOVE':
+        op = OP_MOVE
+        btn = BTN_NONE
+        if n >= 7:
+            x, y, t = parts[2], parts[3], parts[6]
+            flags, nx, ny = _norm_pair(parts[4], parts[5])
+        else:
+            x = parts[2] if n > 2 else 0
+            y = parts[3] if n > 3 else 0
+            t = parts[4] if n > 4 else 0
+    elif sub == 'CLICK':
+        btn = BTN_LEFT if n > 2 and parts[2] == 'left' else BTN_RIGHT
+        op = OP_CLICK_DOWN if n > 3 and parts[3] == 'DOWN' else OP_CLICK_UP
+        if n >= 9:
+            x, y, t = parts[4], parts[5], parts[8]
+            flags, nx, ny = _norm_pair(parts[6], parts[7])
+        else:
+            x = parts[4] if n > 4 else 0
+            y = parts[5] if n > 5 else 0
+            t = parts[-1] if n > 6 else 0
+    elif sub == 'SCROLL':
+        op = OP_SCROLL
+        btn = BTN_NONE
+        x = parts[2] if n > 2 else 0
+        y = parts[3] if n > 3 else 0
+        t = parts[4] if n > 4 else 0
+    else:
+        return None
+    return (op, btn, flags, _to_int(x), _to_int(y), nx, ny, max(0, min(0x7FFFFFFF, _to_int(t))))
+
+
+def record_to_line(rec) -> str:
+    op, btn, flags, x, y, nx, ny, t = rec
+    if op == OP_KEY_DOWN:
+        return f"K DOWN {x} {t}"
+    if op == OP_KEY_UP:
+        return f"K UP {x} {t}"
+    if op == OP_SCROLL:
+        return f"M SCROLL {x} {y} {t}"
+    norm = f" {nx:.6f} {ny:.6f}" if flags & FLAG_NORM else ''
+    if op == OP_MOVE:
+        return f"M MOVE {x} {y}{norm} {t}"
+    b = 'left' if btn == BTN_LEFT else 'right'
+    act = 'DOWN' if op == OP_CLICK_DOWN else 'UP'
+    return f"M CLICK {b} {act} {x} {y}{norm} {t}"
+
+
+def append_record(cols: Dict[str, array], rec) -> None:
+    for (name, _), v in zip(COLUMNS, rec):
+        cols[name].append(v)
+
+
+def write_header(f, meta_lines: List[str], compress: bool = True) -> None:
+    meta = '\n'.join(meta_lines).encode('utf-8')
+    f.write(_HEAD.pack(MAGIC, VERSION, HDR_ZLIB if compress else 0, len(meta)))
+    f.write(meta)
+
+
+def _read_header(f) -> Tuple[List[str], int]:
+    head = f.read(_HEAD.size)
+    if len(head) < _HEAD.size:
+        raise ValueError('truncated header')
+    magic, version, flags, meta_len = _HEAD.unpack(head)
+    if magic != MAGIC:
+        raise ValueError('not a binary action file')
+    if version > VERSION:
+        raise ValueError(f'unsupported binary action version {version}')
+    meta = f.read(meta_len).decode('utf-8')
+    return (meta.split('\n') if meta else []), flags
+
+
+def read_header(f) -> List[str]:
+    return _read_header(f)[0]
+
+
+def read_meta_lines(path: str) -> List[str]:
+    with open(path, 'rb') as f:
+        return read_header(f)
+
+
+def header_flags(path: str) -> int:
+    with open(path, 'rb') as f:
+        return _read_header(f)[1]
+
+
+def _encode_payload(cols: Dict[str, array], flags: int) -> bytes:
+    parts = []
+    for name, tc in COLUMNS:
+        col = cols[name]
+        if flags & HDR_ZLIB and name in _DELTA_COLS:
+            prev = 0
+            d = array('i')
+            for v in col:
+                d.append(v - prev)
+                prev = v
+            col = d
+        if _SWAP and col.itemsize > 1:
+            col = array(col.typecode, col)
+            col.byteswap()
+        parts.append(col.tobytes())
+    payload = b''.join(parts)
+    return zlib.compress(payload, 6) if flags & HDR_ZLIB else payload
+
+
+def _decode_payload(payload: bytes, n: int, flags: int) -> Optional[Dict[str, array]]:
+    if flags & HDR_ZLIB:
+        payload = zlib.decompress(payload)
+    if len(payload) < n * RECORD_SIZE:
+        return None
+    cols = {}
+    pos = 0
+    for name, tc in COLUMNS:
+        delta = bool(flags & HDR_ZLIB) and name in _DELTA_COLS
+        col = array('i' if delta else tc)
+        size = n * col.itemsize
+        col.frombytes(payload[pos:pos + size])
+        pos += size
+        if _SWAP and col.itemsize > 1:
+            col.byteswap()
+        if delta:
+            col = array(tc, accumulate(col))
+        cols[name] = col
+    return cols
+
+
+def write_block(f, cols: Dict[str, array], flags: int = HDR_ZLIB) -> None:
+    n = len(cols['t'])
+    if n == 0:
+        return
+    payload = _encode_payload(cols, flags)
+    f.write(_BLOCK.pack(n, len(payload)))
+    f.write(payload)
+    f.write(_BLOCK.pack(len(payload), n))
+
+
+def iter_blocks(f, flags: int):
+    """Yield column dicts block by block; f must be positioned after the header."""
+    while True:
+        raw = f.read(_BLOCK.size)
+        if len(raw) < _BLOCK.size:
+            return
+        n, size = _BLOCK.unpack(raw)
+        payload = f.read(size)
+        if len(payload) < size:
+            return  # truncated tail (e.g. recorder killed mid-write)
+        try:
+            cols = _decode_payload(payload, n, flags)
+        except Exception:
+            return
+        if cols is None:
+            return
+        f.read(_BLOCK.size)
+        yield cols
+
+
+def read_last_block(path: str) -> Optional[Dict[str, array]]:
+    """Decode only the final block, seeking from the end of the file."""
+    with open(path, 'rb') as f:
+        _, flags = _read_header(f)
+        data_start = f.tell()
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        if end - data_start < 2 * _BLOCK.size:
+            return None
+        f.seek(end - _BLOCK.size)
+        size, n = _BLOCK.unpack(f.read(_BLOCK.size))
+        start = end - _BLOCK.size - size
+        if start - _BLOCK.size < data_start:
+            return None
+        f.seek(start)
+        return _decode_payload(f.read(size), n, flags)
+
+
+def read_binary(path: str) -> Tuple[List[str], Dict[str, array]]:
+    """Load the whole file: (meta_lines, columns)."""
+    cols = new_columns()
+    with open(path, 'rb') as f:
+        meta_lines, flags = _read_header(f)
+        for blk in iter_blocks(f, flags):
+            for name, _ in COLUMNS:
+                cols[name].extend(blk[name])
+    return meta_lines, cols
+
+
+def iter_records(path: str):
+    with open(path, 'rb') as f:
+        _, flags = _read_header(f)
+        for blk in iter_blocks(f, flags):
+            yield from zip(*(blk[name] for name, _ in COLUMNS))
+
+
+def write_binary(path: str, meta_lines: List[str], records, compress: bool = True) -> int:
+    count = 0
+    flags = HDR_ZLIB if compress else 0
+    cols = new_columns()
+    with open(path, 'wb') as f:
+        write_header(f, meta_lines, compress)
+        for rec in records:
+            append_record(cols, rec)
+            count += 1
+            if len(cols['t']) >= BLOCK_SIZE:
+                write_block(f, cols, flags)
+                cols = new_columns()
+        write_block(f, cols, flags)
+    return count
+
+
+def read_action_lines(path: str) -> List[str]:
+    """Text lines of an action file in either format (binary is rendered as text)."""
+    if is_binary_action(path):
+        meta_lines = read_meta_lines(path)
+        return meta_lines + [record_to_line(r) for r in iter_records(path)]
+    with open(path, 'r', encoding='utf-8') as f:
+        return [ln.rstrip('\n') for ln in f.readlines()]
+
+
+def write_action_lines(path: str, lines: List[str], binary: bool = None) -> int:
+    """Write text lines to path, as binary when the path is (or should become) binary."""
+    if binary is None:
+        binary = path.lower().endswith(BINARY_EXT) or is_binary_action(path)
+    if not binary:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        return len(lines)
+    meta_lines = []
+    records = []
+    for s in lines:
+        st = s.strip()
+        if not st:
+            continue
+        if st.startswith('#') or st.startswith('META '):
+            meta_lines.append(st)
+            continue
+        rec = encode_line(st)
+        if rec is not None:
+            records.append(rec)
+    return write_binary(path, meta_lines, records)
+
+
+def text_to_binary(src: str, dst: str) -> int:
+    with open(src, 'r', encoding='utf-8') as f:
+        lines = [ln.rstrip('\n') for ln in f]
+    return write_action_lines(dst, lines, binary=True)
+
+
+def binary_to_text(src: str, dst: str) -> int:
+    lines = read_action_lines(src)
+    with open(dst, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    return len(lines)
+
+
+if __name__ == '__main__':
+    # python -m core.action_binary <src> [dst]  (direction picked from src contents)
+    if len(sys.argv) < 2:
+        print('usage: python -m core.action_binary <src> [dst]')
+        sys.exit(2)
+    src = sys.argv[1]
+    if is_binary_action(src):
+        dst = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(src)[0] + '.action'
+        n = binary_to_text(src, dst)
+        print(f'{src} -> {dst}: {n} lines')
+    else:
+        dst = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(src)[0] + BINARY_EXT
+        n = text_to_binary(src, dst)
+        print(f'{src} -> {dst}: {n} events, {os.path.getsize(src)} -> {os.path.getsize(dst)} bytes')
@@ -0,0 +1,168 @@
+"""Per-file metadata cache for action files, persisted in one JSON index.
+
+Entries are keyed by absolute path and are valid while (mtime_ns, size) match.
+A miss only costs a header read (META lines, first timestamp) and a tail read
+(last timestamps); event counts and the exact duration are filled in once the
+file is fully parsed anyway (see record_timeline()).
+"""
+import json
+import os
+import threading
+from typing import Dict, Optional
+
+from core import action_binary
+
+
+INDEX_PATH = 'action_index.json'
+HEADER_MAX_LINES = 64
+TAIL_BYTES = 8192
+
+_lock = threading.Lock()
+_index: Optional[Dict[str, dict]] = None
+
+
+def _key(path: str) -> str:
+    return os.path.abspath(path)
+
+
+def _stat(path: str):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _load_index() -> Dict[str, dict]:
+    global _index
+    if _index is None:
+        try:
+            with open(INDEX_PATH, 'r', encoding='utf-8') as f:
+                data = json.load(f) or {}
+            _index = data if isinstance(data, dict) else {}
+        except Exception:
+            _index = {}
+    return _index
+
+
+def _save_index() -> None:
+    try:
+        idx = {k: v for k, v in (_index or {}).items() if os.path.exists(k)}
+        tmp = INDEX_PATH + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(idx, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, INDEX_PATH)
+    except Exception:
+        pass
+
+
+def _meta_fields(meta_lines) -> dict:
+    out = {'screen': '', 'start': '', 'restart': None}
+    for s in meta_lines:
+        parts = s.split()
+        if len(parts) < 3 or parts[0] != 'META':
+            continue
+        if parts[1] == 'SCREEN' and len(parts) >= 4 and not out['screen']:
+            out['screen'] = f"{parts[2]}x{parts[3]}"
+        elif parts[1] == 'START' and not out['start']:
+            out['start'] = parts[2]
+        elif parts[1] == 'RESTART' and out['restart'] is None:
+            try:
+                out['restart'] = int(float(parts[2]))
+            except Exception:
+                pass
+    return out
+
+
+def _scan_text(path: str, size: int) -> dict:
+    meta_lines = []
+    first_ms = None
+    with open(path, 'r', encoding='utf-8') as f:
+        for i, line in enumerate(f):
+            s = line.strip()
+            if s.startswith('META ') or s.startswith('#') or not s:
+                if s.startswith('META '):
+                    meta_lines.append(s)
+                if i < HEADER_MAX_LINES:
+                    continue
+                break
+            rec = action_binary.encode_line(s)
+            if rec is not None:
+                first_ms = rec[7]
+                break
+    tail_ms = []
+    with open(path, 'rb') as f:
+        start = max(0, size - TAIL_BYTES)
+        f.seek(start)
+        chunk = f.read().decode('utf-8', errors='ignore').splitlines()
+        if start > 0 and chunk:
+            chunk = chunk[1:]  # first line is probably cut in half
+        for s in chunk:
+            rec = action_binary.encode_line(s.strip())
+            if rec is not None:
+                tail_ms.append(rec[7])
+    info = _meta_fields(meta_lines)
+    info['first_ms'] = first_ms or 0
+    info['last_ms'] = tail_ms[-1] if tail_ms else 0
+    info['duration_ms'] = max(tail_ms) if tail_ms else 0
+    return info
+
+
+def _scan_binary(path: str) -> dict:
+    with open(path, 'rb') as f:
+        meta_lines, flags = action_binary._read_header(f)
+        first = next(action_binary.iter_blocks(f, flags), None)
+    last = action_binary.read_last_block(path)
+    info = _meta_fields(meta_lines)
+    info['first_ms'] = first['t'][0] if first and len(first['t']) else 0
+    info['last_ms'] = last['t'][-1] if last and len(last['t']) else 0
+    info['duration_ms'] = max(last['t']) if last and len(last['t']) else 0
+    return info
+
+
+def get_action_meta(path: str) -> dict:
+    """Cached metadata: duration_ms, screen, start, restart, first_ms, last_ms, counts, complete."""
+    mtime_ns, size = _stat(path)
+    key = _key(path)
+    with _lock:
+        ent = _load_index().get(key)
+        if ent and ent.get('mtime_ns') == mtime_ns and ent.get('size') == size:
+            return dict(ent)
+    if action_binary.is_binary_action(path):
+        info = _scan_binary(path)
+    else:
+        info = _scan_text(path, size)
+    info.update({'mtime_ns': mtime_ns, 'size': size, 'counts': None, 'complete': False})
+    with _lock:
+        _load_index()[key] = info
+        _save_index()
+    return dict(info)
+
+
+def record_timeline(path: str, timeline) -> None:
+    """Store exact figures from a fully parsed Timeline (no extra I/O beyond the index write)."""
+    try:
+        mtime_ns, size = _stat(path)
+    except Exception:
+        return
+    key = _key(path)
+    with _lock:
+        ent = _load_index().get(key)
+        if ent and ent.get('complete') and ent.get('mtime_ns') == mtime_ns and ent.get('size') == size:
+            return
+        t = timeline.t
+        info = _meta_fields(timeline.meta_lines)
+        info.update({
+            'mtime_ns': mtime_ns,
+            'size': size,
+            'duration_ms': timeline.duration_ms,
+            'first_ms': t[0] if len(t) else 0,
+            'last_ms': t[-1] if len(t) else 0,
+            'counts': timeline.counts(),
+            'complete': True,
+        })
+        _index[key] = info
+        _save_index()
+
+
+def invalidate(path: str) -> None:
+    with _lock:
+        if _load_index().pop(_key(path), None) is not None:
+            _save_index()
@@ -45,7 +45,7 @@ def parse_action_line(s: str) -> Dict[str, str]:
                 d['op'] = 'CLICK'
                 d['btn'] = parts[2] if len(parts) > 2 else ''
                 d['act'] = parts[3] if len(parts) > 3 else ''
-                if len(parts) >= 10:
+                if len(parts) >= 9:
                     d['x'], d['y'], d['nx'], d['ny'], d['ms'] = parts[4], parts[5], parts[6], parts[7], parts[8]
                 else:
                     d['x'] = parts[4] if len(parts) > 4 else ''
@@ -0,0 +1,239 @@
+"""Input injection backends used by Replayer.
+
+Every backend implements press/release (virtual-key codes), move/move_rel,
+click (BTN_LEFT/BTN_RIGHT, down flag), click_at, scroll and flush. pynput and
+pydirectinput are imported lazily so replay can run headless with the
+null/recording backends.
+"""
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from core.action_binary import BTN_LEFT
+
+
+class InputBackend:
+    name = 'base'
+    # events due within this many seconds of each other may be grouped (see BatchingBackend)
+    tick = 0.0
+
+    def press(self, vk: int) -> None:
+        pass
+
+    def release(self, vk: int) -> None:
+        pass
+
+    def move(self, x: int, y: int) -> None:
+        pass
+
+    def move_rel(self, dx: int, dy: int) -> None:
+        pass
+
+    def click(self, btn: int, down: bool) -> None:
+        pass
+
+    def scroll(self, dx: int, dy: int) -> None:
+        pass
+
+    def click_at(self, btn: int, down: bool, x: int, y: int) -> None:
+        self.move(x, y)
+        self.click(btn, down)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.flush()
+
+
+class NullBackend(InputBackend):
+    """Swallows everything; for profiling the scheduler/dispatch path on its own."""
+    name = 'null'
+
+
+class PynputBackend(InputBackend):
+    name = 'pynput'
+
+    def __init__(self):
+        from pynput.keyboard import Controller as KeyBoardController, KeyCode
+        from pynput.mouse import Button, Controller as MouseController
+        self._kb = KeyBoardController()
+        self._ms = MouseController()
+        self._key_code = KeyCode.from_vk
+        self._keys = {}
+        self._buttons = (Button.left, Button.right)
+
+    def _key(self, vk):
+        key = self._keys.get(vk)
+        if key is None:
+            key = self._keys[vk] = self._key_code(vk)
+        return key
+
+    def _button(self, btn):
+        return self._buttons[0] if btn == BTN_LEFT else self._buttons[1]
+
+    def press(self, vk):
+        self._kb.press(self._key(vk))
+
+    def release(self, vk):
+        self._kb.release(self._key(vk))
+
+    def move(self, x, y):
+        self._ms.position = (x, y)
+
+    def move_rel(self, dx, dy):
+        self._ms.move(dx, dy)
+
+    def click(self, btn, down):
+        if down:
+            self._ms.press(self._button(btn))
+        else:
+            self._ms.release(self._button(btn))
+
+    def scroll(self, dx, dy):
+        self._ms.scroll(dx, dy)
+
+
+_pdi = None
+
+
+def directinput_available() -> bool:
+    """Import pydirectinput once; DirectInput-style relative mouse works better in many games."""
+    global _pdi
+    if _pdi is None:
+        try:
+            import pydirectinput
+            try:
+                pydirectinput.PAUSE = 0
+                pydirectinput.FAILSAFE = False
+            except Exception:
+                pass
+            _pdi = pydirectinput
+        except Exception:
+            _pdi = False
+    return bool(_pdi)
+
+
+class DirectInputBackend(PynputBackend):
+    """pynput, except relative moves go through pydirectinput when it is installed."""
+    name = 'directinput'
+
+    def move_rel(self, dx, dy):
+        if directinput_available():
+            try:
+                _pdi.moveRel(dx, dy, duration=0, relative=True)
+                return
+            except Exception:
+                pass
+        super().move_rel(dx, dy)
+
+
+class RecordingBackend(InputBackend):
+    """Captures (monotonic, method, args) for every call, optionally forwarding to `inner`."""
+    name = 'recording'
+
+    def __init__(self, inner: Optional[InputBackend] = None):
+        self.inner = inner
+        self.calls: List[Tuple[float, str, tuple]] = []
+        self._lock = threading.Lock()
+
+    def _log(self, method, args):
+        with self._lock:
+            self.calls.append((time.monotonic(), method, args))
+        if self.inner is not None:
+            getattr(self.inner, method)(*args)
+
+    def press(self, vk):
+        self._log('press', (vk,))
+
+    def release(self, vk):
+        self._log('release', (vk,))
+
+    def move(self, x, y):
+        self._log('move', (x, y))
+
+    def move_rel(self, dx, dy):
+        self._log('move_rel', (dx, dy))
+
+    def click(self, btn, down):
+        self._log('click', (btn, down))
+
+    def scroll(self, dx, dy):
+        self._log('scroll', (dx, dy))
+
+    def flush(self):
+        if self.inner is not None:
+            self.inner.flush()
+
+
+class BatchingBackend(InputBackend):
+    """Queues calls and sends them to `inner` on flush().
+
+    Replayer skips the wait for events due within `tick` of now and flushes before
+    the next real wait, so everything due in the same tick goes out back to back.
+    Consecutive absolute moves inside one batch collapse to the last one.
+    """
+    name = 'batching'
+
+    def __init__(self, inner: InputBackend, tick: float = 0.001):
+        self.inner = inner
+        self.tick = float(tick)
+        self._queue = []
+
+    def press(self, vk):
+        self._queue.append((self.inner.press, (vk,)))
+
+    def release(self, vk):
+        self._queue.append((self.inner.release, (vk,)))
+
+    def move(self, x, y):
+        q = self._queue
+        if q and q[-1][0] == self.inner.move:
+            q[-1] = (self.inner.move, (x, y))
+        else:
+            q.append((self.inner.move, (x, y)))
+
+    def move_rel(self, dx, dy):
+        self._queue.append((self.inner.move_rel, (dx, dy)))
+
+    def click(self, btn, down):
+        self._queue.append((self.inner.click, (btn, down)))
+
+    def scroll(self, dx, dy):
+        self._queue.append((self.inner.scroll, (dx, dy)))
+
+    def flush(self):
+        q, self._queue = self._queue, []
+        for fn, args in q:
+            try:
+                fn(*args)
+            except Exception:
+                pass
+        self.inner.flush()
+
+    def close(self):
+        self.flush()
+        self.inner.close()
+
+
+BACKENDS = {
+    'pynput': PynputBackend,
+    'directinput': DirectInputBackend,
+    'null': NullBackend,
+    'recording': RecordingBackend,
+}
+
+
+def make_backend(spec=None) -> InputBackend:
+    """Backend from an instance, a name in BACKENDS (optionally 'batching:<name>') or None.
+
+    None picks DirectInputBackend when pydirectinput is installed, else PynputBackend.
+    """
+    if isinstance(spec, InputBackend):
+        return spec
+    name = str(spec or '').lower()
+    if name.startswith('batching:'):
+        return BatchingBackend(make_backend(name.split(':', 1)[1] or None))
+    if name in BACKENDS:
+        return BACKENDS[name]()
+    return DirectInputBackend() if directinput_available() else PynputBackend()
@@ -0,0 +1,190 @@
+"""Template matching helpers for the image monitor (grayscale numpy frames)."""
+import cv2
+import numpy as np
+
+
+DEFAULT_THRESHOLD = 0.8
+# below this many pixels per side a downscaled template stops being distinctive
+MIN_PYRAMID_SIDE = 8
+
+
+class TemplateMatcher:
+    """TM_CCOEFF_NORMED matcher with optional coarse-to-fine pyramid search.
+
+    With pyramid_scale < 1 the frame and template are first matched at that scale;
+    the best `candidates` peaks scoring at least threshold - coarse_slack are then
+    verified at full resolution in a small window, so hit semantics (full-resolution
+    score >= threshold) stay the same as a plain full-frame match.
+
+    The last hit location is remembered and checked first in a window of
+    `local_pad` pixels around it; only when that scores below threshold does the
+    full search run (local_pad=0 disables this). `stats` counts both paths.
+    """
+
+    def __init__(self, tmpl, threshold: float = DEFAULT_THRESHOLD, pyramid_scale: float = 1.0, candidates: int = 3, coarse_slack: float = 0.2, local_pad: int = 8):
+        # tmpl: grayscale array, or a core.template_cache.TemplateEntry (reuses its scaled copies)
+        entry = tmpl if hasattr(tmpl, 'scaled') else None
+        if entry is not None:
+            tmpl = entry.gray
+        self.tmpl = tmpl
+        self.local_pad = max(0, int(local_pad))
+        self.last_loc = None
+        self.stats = {'local_hit': 0, 'local_miss': 0, 'search': 0}
+        self.threshold = float(threshold)
+        self.candidates = max(1, int(candidates))
+        self.coarse_slack = float(coarse_slack)
+        self.th, self.tw = tmpl.shape[:2]
+        scale = float(pyramid_scale or 1.0)
+        if not (0.0 < scale < 1.0) or min(self.th, self.tw) * scale < MIN_PYRAMID_SIDE:
+            scale = 1.0
+        self.scale = scale
+        self._small = None
+        if scale < 1.0:
+            if entry is not None:
+                self._small = entry.scaled(scale)
+            else:
+                self._small = cv2.resize(tmpl, (max(1, int(round(self.tw * scale))), max(1, int(round(self.th * scale)))), interpolation=cv2.INTER_AREA)
+
+    def _full(self, frame):
+        if frame.shape[0] < self.th or frame.shape[1] < self.tw:
+            return 0.0, None
+        res = cv2.matchTemplate(frame, self.tmpl, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, max_loc = cv2.minMaxLoc(res)
+        return float(max_val), max_loc
+
+    def _peaks(self, res, k, min_val):
+        # repeated minMaxLoc with the neighbourhood of each peak blanked out
+        sh, sw = self._small.shape[:2]
+        res = res.copy()
+        out = []
+        for _ in range(k):
+            _, v, _, (x, y) = cv2.minMaxLoc(res)
+            if v < min_val:
+                break
+            out.append((x, y))
+            res[max(0, y - sh // 2):y + sh // 2 + 1, max(0, x - sw // 2):x + sw // 2 + 1] = -1.0
+        return out
+
+    def verify(self, frame, x, y, pad: int):
+        """Full-resolution score around top-left (x, y); returns (score, loc)."""
+        fh, fw = frame.shape[:2]
+        x0 = max(0, x - pad); y0 = max(0, y - pad)
+        x1 = min(fw, x + self.tw + pad); y1 = min(fh, y + self.th + pad)
+        if x1 - x0 < self.tw or y1 - y0 < self.th:
+            return 0.0, None
+        res = cv2.matchTemplate(frame[y0:y1, x0:x1], self.tmpl, cv2.TM_CCOEFF_NORMED)
+        _, v, _, (lx, ly) = cv2.minMaxLoc(res)
+        return float(v), (x0 + lx, y0 + ly)
+
+    def _local(self, frame):
+        """(score, loc) around the last hit, or None when there is no usable last hit."""
+        if self.local_pad <= 0 or self.last_loc is None:
+            return None
+        v, loc = self.verify(frame, self.last_loc[0], self.last_loc[1], self.local_pad)
+        if v >= self.threshold:
+            self.stats['local_hit'] += 1
+            self.last_loc = loc
+            return v, loc
+        self.stats['local_miss'] += 1
+        return None
+
+    def _remember(self, best):
+        self.last_loc = best[1] if best[0] >= self.threshold else None
+        return best
+
+    def match(self, frame):
+        """Best (score, top-left loc or None) in the frame; a hit at the last location wins early."""
+        local = self._local(frame)
+        if local is not None:
+            return local
+        self.stats['search'] += 1
+        return self._remember(self._search(frame))
+
+    def _search(self, frame):
+        if self._small is None:
+            return self._full(frame)
+        fh, fw = frame.shape[:2]
+        small = cv2.resize(frame, (max(1, int(round(fw * self.scale))), max(1, int(round(fh * self.scale)))), interpolation=cv2.INTER_AREA)
+        if small.shape[0] < self._small.shape[0] or small.shape[1] < self._small.shape[1]:
+            return self._full(frame)
+        res = cv2.matchTemplate(small, self._small, cv2.TM_CCOEFF_NORMED)
+        pad = int(np.ceil(2.0 / self.scale)) + 2
+        best = (0.0, None)
+        for cx, cy in self._peaks(res, self.candidates, self.threshold - self.coarse_slack):
+            v, loc = self.verify(frame, int(round(cx / self.scale)), int(round(cy / self.scale)), pad)
+            if v > best[0]:
+                best = (v, loc)
+                if v >= self.threshold:
+                    break
+        return best
+
+    def windows(self, frame, rects):
+        """Search windows for changed rects: every placement of the template that overlaps one."""
+        fh, fw = frame.shape[:2]
+        out = []
+        for x, y, w, h in rects:
+            x0 = max(0, x - self.tw + 1); y0 = max(0, y - self.th + 1)
+            x1 = min(fw, x + w + self.tw - 1); y1 = min(fh, y + h + self.th - 1)
+            if x1 - x0 >= self.tw and y1 - y0 >= self.th:
+                out.append((x0, y0, x1 - x0, y1 - y0))
+        return out
+
+    def match_in(self, frame, windows):
+        """Best (score, loc in frame coordinates) over the given (x, y, w, h) windows."""
+        local = self._local(frame)
+        if local is not None:
+            return local
+        self.stats['search'] += 1
+        best = (0.0, None)
+        for x, y, w, h in windows:
+            v, loc = self._search(frame[y:y + h, x:x + w])
+            if loc is not None and v > best[0]:
+                best = (v, (x + loc[0], y + loc[1]))
+                if v >= self.threshold:
+                    break
+        return self._remember(best)
+
+    def hit(self, frame) -> bool:
+        return self.match(frame)[0] >= self.threshold
+
+
+class ChangeDetector:
+    """Block difference against the last frame that was actually matched.
+
+    `dirty(frame)` returns None when there is nothing to compare against (first
+    frame or a size change), [] when no block changed, else a list of (x, y, w, h)
+    rectangles covering the changed blocks. The reference frame only moves on
+    when something changed, so slow fades still add up past the threshold.
+    """
+
+    def __init__(self, block: int = 16, threshold: int = 4):
+        self.block = max(1, int(block))
+        self.threshold = int(threshold)
+        self._prev = None
+
+    def reset(self):
+        self._prev = None
+
+    def dirty(self, frame):
+        prev = self._prev
+        if prev is None or prev.shape != frame.shape:
+            self._prev = frame.copy()
+            return None
+        b = self.block
+        fh, fw = frame.shape[:2]
+        gh, gw = -(-fh // b), -(-fw // b)
+        diff = cv2.absdiff(frame, prev)
+        if gh * b != fh or gw * b != fw:
+            diff = cv2.copyMakeBorder(diff, 0, gh * b - fh, 0, gw * b - fw, cv2.BORDER_CONSTANT, value=0)
+        # per-block max, so a single changed pixel is enough to mark its block
+        mask = (diff.reshape(gh, b, gw, b).max(axis=(1, 3)) > self.threshold).astype(np.uint8)
+        if not mask.any():
+            return []
+        # copy: frames may live in a reused capture buffer
+        self._prev = frame.copy()
+        n, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        out = []
+        for i in range(1, n):
+            x, y, w, h = (int(v) for v in stats[i][:4])
+            out.append((x * b, y * b, min(fw, (x + w) * b) - x * b, min(fh, (y + h) * b) - y * b))
+        return out
@@ -1,112 +1,444 @@
+import atexit
+import logging
+import os
+import queue
 import threading
 import time
+from dataclasses import dataclass
 from typing import Optional
-from pynput import keyboard, mouse
-from pynput.keyboard import Key
 from core.utils import get_screen_size
+from core.screen import screen_geometry
+from core import action_binary
+
+
+# raw hook events: (kind, x, y, button, monotonic_ns)
+# keys keep the vk in x, scrolls keep dx/dy in x/y, button is 'left'/'right' for clicks
+EV_KEY_DOWN, EV_KEY_UP, EV_MOVE, EV_CLICK_DOWN, EV_CLICK_UP, EV_SCROLL = range(6)
+
+# writer thread flush policy
+FLUSH_LINES = 512
+FLUSH_INTERVAL_S = 0.25
+
+
+@dataclass
+class CoalesceOptions:
+    """Capture-time thinning; 0/False disables each part."""
+    move_ms: int = 0        # drop moves closer than this in time to the last kept move...
+    move_px: int = 0        # ...and/or closer than this in pixels (both must be met when both are set)
+    scroll_ms: int = 0      # sum scroll events within this window into one
+    key_repeat: bool = False  # collapse auto-repeat K DOWNs into the first press
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.move_ms or self.move_px or self.scroll_ms or self.key_repeat)
+
+    def meta_line(self) -> str:
+        return (f"META COALESCE move_ms={int(self.move_ms)} move_px={int(self.move_px)} "
+                f"scroll_ms={int(self.scroll_ms)} key_repeat={1 if self.key_repeat else 0}")
+
+    @staticmethod
+    def from_settings(data: dict) -> 'CoalesceOptions':
+        try:
+            return CoalesceOptions(
+                move_ms=max(0, int(data.get('coalesce_move_ms', 0) or 0)),
+                move_px=max(0, int(data.get('coalesce_move_px', 0) or 0)),
+                scroll_ms=max(0, int(data.get('coalesce_scroll_ms', 0) or 0)),
+                key_repeat=bool(data.get('coalesce_key_repeat', False)),
+            )
+        except Exception:
+            return CoalesceOptions()
+
+
+class _Coalescer:
+    """Filters raw hook events in the writer thread according to CoalesceOptions.
+
+    A dropped move is held back and emitted right before the next non-move event,
+    so the cursor is always where it really was when a click (or key) happens.
+    """
+    def __init__(self, opts: CoalesceOptions):
+        self.move_ns = int(opts.move_ms) * 1_000_000
+        self.move_px = int(opts.move_px)
+        self.scroll_ns = int(opts.scroll_ms) * 1_000_000
+        self.key_repeat = bool(opts.key_repeat)
+        self._last_move = None
+        self._held_move = None
+        self._scroll = None
+        self._down = set()
+        self.dropped = 0
+
+    def _flush_pending(self, out):
+        if self._scroll is not None:
+            out.append(self._scroll)
+            self._scroll = None
+        if self._held_move is not None:
+            out.append(self._held_move)
+            self._last_move = self._held_move
+            self._held_move = None
+
+    def feed(self, ev) -> list:
+        kind = ev[0]
+        out = []
+        if kind == EV_MOVE:
+            if self._scroll is not None:
+                out.append(self._scroll)
+                self._scroll = None
+            last = self._last_move
+            if last is not None and (self.move_ns or self.move_px):
+                near_t = not self.move_ns or ev[4] - last[4] < self.move_ns
+                near_px = not self.move_px or max(abs(ev[1] - last[1]), abs(ev[2] - last[2])) < self.move_px
+                if near_t and near_px:
+                    if self._held_move is not None:
+                        self.dropped += 1
+                    self._held_move = ev
+                    return out
+            if self._held_move is not None:
+                self.dropped += 1
+                self._held_move = None
+            self._last_move = ev
+            out.append(ev)
+            return out
+        if kind == EV_SCROLL and self.scroll_ns:
+            if self._held_move is not None:
+                out.append(self._held_move)
+                self._last_move = self._held_move
+                self._held_move = None
+            cur = self._scroll
+            if cur is not None and ev[4] - cur[4] < self.scroll_ns:
+                self._scroll = (EV_SCROLL, cur[1] + ev[1], cur[2] + ev[2], '', cur[4])
+                self.dropped += 1
+                return out
+            if cur is not None:
+                out.append(cur)
+            self._scroll = ev
+            return out
+        self._flush_pending(out)
+        if self.key_repeat:
+            if kind == EV_KEY_DOWN:
+                if ev[1] in self._down:
+                    self.dropped += 1
+                    return out
+                self._down.add(ev[1])
+            elif kind == EV_KEY_UP:
+                self._down.discard(ev[1])
+        out.append(ev)
+        return out
+
+    def drain(self) -> list:
+        out = []
+        self._flush_pending(out)
+        return out
 
 
 class _Writer:
+    """Text sink; keeps the file open for the whole recording."""
     def __init__(self, path: str):
         self.path = path
-        self._lock = threading.Lock()
+        self._f = None
+
+    def write_lines(self, lines):
+        if self._f is None:
+            self._f = open(self.path, 'a', encoding='utf-8')
+        self._f.write(''.join(s + "\n" for s in lines))
 
     def write_line(self, line: str):
-        with self._lock:
-            with open(self.path, 'a', encoding='utf-8') as f:
-                f.write(line + "\n")
+        self.write_lines((line,))
+
+    def flush(self):
+        if self._f is not None:
+            self._f.flush()
+
+    def close(self):
+        f, self._f = self._f, None
+        if f is None:
+            return
+        try:
+            f.flush()
+            os.fsync(f.fileno())
+        except Exception:
+            pass
+        f.close()
+
+
+class _BinaryWriter:
+    """Appends events to a binary action file whose header is already written."""
+    def __init__(self, path: str):
+        self.path = path
+        self._flags = action_binary.header_flags(path)
+        self._cols = action_binary.new_columns()
+        self._last_block = time.monotonic()
+
+    def write_lines(self, lines):
+        for line in lines:
+            rec = action_binary.encode_line(line)
+            if rec is not None:
+                action_binary.append_record(self._cols, rec)
+        if len(self._cols['t']) >= action_binary.BLOCK_SIZE:
+            self._flush_block()
+
+    def write_line(self, line: str):
+        self.write_lines((line,))
+
+    def _flush_block(self, fsync: bool = False):
+        if not len(self._cols['t']):
+            return
+        with open(self.path, 'ab') as f:
+            action_binary.write_block(f, self._cols, self._flags)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        self._cols = action_binary.new_columns()
+        self._last_block = time.monotonic()
+
+    def flush(self):
+        # same time policy as text mode: a partial block at most every FLUSH_INTERVAL_S, so a
+        # crash loses well under a second of input while busy recordings still get full blocks
+        if time.monotonic() - self._last_block >= FLUSH_INTERVAL_S:
+            self._flush_block()
+
+    def close(self):
+        self._flush_block(fsync=True)
+
+
+class _AsyncWriter(threading.Thread):
+    """Formats raw hook events off the hook threads and batch-writes them to a sink.
+
+    push() is a single SimpleQueue.put, so input callbacks never touch the file,
+    a lock or float formatting. The thread flushes every FLUSH_LINES lines or
+    FLUSH_INTERVAL_S seconds, and close() drains the queue and fsyncs.
+    """
+    def __init__(self, sink, start_ns: int, coalesce: Optional[CoalesceOptions] = None):
+        super().__init__()
+        self.daemon = True
+        self.sink = sink
+        self.start_ns = start_ns
+        self.coalescer = _Coalescer(coalesce) if coalesce is not None and coalesce.enabled else None
+        self.sw, self.sh = get_screen_size()
+        self._q = queue.SimpleQueue()
+        self.push = self._q.put
+        self._close_lock = threading.Lock()
+        self._closed = False
+
+    def _format(self, ev) -> str:
+        kind, x, y, button, t_ns = ev
+        t = (t_ns - self.start_ns) // 1_000_000
+        if kind == EV_MOVE or kind == EV_CLICK_DOWN or kind == EV_CLICK_UP:
+            head = "M MOVE" if kind == EV_MOVE else f"M CLICK {button} {'DOWN' if kind == EV_CLICK_DOWN else 'UP'}"
+            try:
+                nx = float(x) / float(self.sw)
+                ny = float(y) / float(self.sh)
+                return f"{head} {int(x)} {int(y)} {nx:.6f} {ny:.6f} {t}"
+            except Exception:
+                return f"{head} {int(x)} {int(y)} {t}"
+        if kind == EV_KEY_DOWN:
+            return f"K DOWN {x} {t}"
+        if kind == EV_KEY_UP:
+            return f"K UP {x} {t}"
+        return f"M SCROLL {int(x)} {int(y)} {t}"
+
+    def run(self):
+        q = self._q
+        coalescer = self.coalescer
+        pending = []
+        last_flush = time.monotonic()
+        done = False
+        while not done:
+            try:
+                ev = q.get(timeout=FLUSH_INTERVAL_S)
+            except queue.Empty:
+                ev = False
+            while ev is not False:
+                if ev is None:
+                    done = True
+                    if coalescer is not None:
+                        pending.extend(self._format(e) for e in coalescer.drain())
+                    break
+                try:
+                    if coalescer is None:
+                        pending.append(self._format(ev))
+                    else:
+                        for e in coalescer.feed(ev):
+                            pending.append(self._format(e))
+                except Exception:
+                    pass
+                if len(pending) >= FLUSH_LINES:
+                    break
+                try:
+                    ev = q.get_nowait()
+                except queue.Empty:
+                    ev = False
+            now = time.monotonic()
+            if pending and (done or len(pending) >= FLUSH_LINES or now - last_flush >= FLUSH_INTERVAL_S):
+                try:
+                    self.sink.write_lines(pending)
+                    self.sink.flush()
+                except Exception:
+                    pass
+                pending = []
+                last_flush = now
+        try:
+            self.sink.close()
+        except Exception:
+            pass
+
+    def close(self, timeout: float = 5.0):
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._q.put(None)
+        if self.is_alive():
+            self.join(timeout)
+
+
+class _HookStats:
+    """Per-listener callback cost; only the hook thread writes to it."""
+    __slots__ = ('calls', 'total_ns', 'max_ns')
+
+    def __init__(self):
+        self.calls = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def add(self, dt_ns: int):
+        self.calls += 1
+        self.total_ns += dt_ns
+        if dt_ns > self.max_ns:
+            self.max_ns = dt_ns
 
 
 class KeyboardRecorder(threading.Thread):
-    def __init__(self, writer: _Writer, stop_event: threading.Event, start_monotonic: float):
+    def __init__(self, writer: _AsyncWriter, stop_event: threading.Event):
         super().__init__()
         self.daemon = True
         self.writer = writer
         self.stop_event = stop_event
-        self.start_mono = start_monotonic
+        self.stats = _HookStats()
 
     def run(self):
+        push = self.writer.push
+        stats = self.stats
+        now_ns = time.monotonic_ns
+        from pynput import keyboard
+        ignored = (keyboard.Key.f10, keyboard.Key.f11)
+
         def on_press(key):
-            if key in (keyboard.Key.f10, keyboard.Key.f11):
+            t0 = now_ns()
+            if key in ignored:
                 return
-            t = int((time.monotonic() - self.start_mono) * 1000)
             try:
                 vk = key.vk
             except AttributeError:
                 vk = key.value.vk
-            self.writer.write_line(f"K DOWN {vk} {t}")
+            push((EV_KEY_DOWN, vk, 0, '', t0))
+            stats.add(now_ns() - t0)
 
         def on_release(key):
+            t0 = now_ns()
             if self.stop_event.is_set():
                 kb.stop(); return False
-            if key in (keyboard.Key.f10, keyboard.Key.f11):
+            if key in ignored:
                 return
-            t = int((time.monotonic() - self.start_mono) * 1000)
             try:
                 vk = key.vk
             except AttributeError:
                 vk = key.value.vk
-            self.writer.write_line(f"K UP {vk} {t}")
+            push((EV_KEY_UP, vk, 0, '', t0))
+            stats.add(now_ns() - t0)
 
         with keyboard.Listener(on_press=on_press, on_release=on_release) as kb:
             kb.join()
 
 
 class MouseRecorder(threading.Thread):
-    def __init__(self, writer: _Writer, stop_event: threading.Event, start_monotonic: float):
+    def __init__(self, writer: _AsyncWriter, stop_event: threading.Event):
         super().__init__()
         self.daemon = True
         self.writer = writer
         self.stop_event = stop_event
-        self.start_mono = start_monotonic
-        self.sw, self.sh = get_screen_size()
+        self.stats = _HookStats()
 
     def run(self):
+        push = self.writer.push
+        stats = self.stats
+        now_ns = time.monotonic_ns
+        from pynput import mouse
+        left = mouse.Button.left
+
         def on_move(x, y):
+            t0 = now_ns()
             if self.stop_event.is_set():
                 ms.stop(); return
-            t = int((time.monotonic() - self.start_mono) * 1000)
-            try:
-                nx = float(x) / float(self.sw)
-                ny = float(y) / float(self.sh)
-                self.writer.write_line(f"M MOVE {int(x)} {int(y)} {nx:.6f} {ny:.6f} {t}")
-            except Exception:
-                self.writer.write_line(f"M MOVE {int(x)} {int(y)} {t}")
+            push((EV_MOVE, x, y, '', t0))
+            stats.add(now_ns() - t0)
 
         def on_click(x, y, button, pressed):
+            t0 = now_ns()
             if self.stop_event.is_set():
                 ms.stop(); return
-            t = int((time.monotonic() - self.start_mono) * 1000)
-            btn = 'left' if button == mouse.Button.left else 'right'
-            act = 'DOWN' if pressed else 'UP'
-            try:
-                nx = float(x) / float(self.sw)
-                ny = float(y) / float(self.sh)
-                self.writer.write_line(f"M CLICK {btn} {act} {int(x)} {int(y)} {nx:.6f} {ny:.6f} {t}")
-            except Exception:
-                self.writer.write_line(f"M CLICK {btn} {act} {int(x)} {int(y)} {t}")
+            push((EV_CLICK_DOWN if pressed else EV_CLICK_UP, x, y, 'left' if button == left else 'right', t0))
+            stats.add(now_ns() - t0)
 
         def on_scroll(x, y, dx, dy):
+            t0 = now_ns()
             if self.stop_event.is_set():
                 ms.stop(); return
-            t = int((time.monotonic() - self.start_mono) * 1000)
-            self.writer.write_line(f"M SCROLL {int(dx)} {int(dy)} {t}")
+            push((EV_SCROLL, dx, dy, '', t0))
+            stats.add(now_ns() - t0)
 
         with mouse.Listener(on_move=on_move, on_click=on_click, on_scroll=on_scroll) as ms:
             ms.join()
 
 
 class Recorder:
-    def __init__(self, path: str, stop_event: threading.Event):
+    def __init__(self, path: str, stop_event: threading.Event, coalesce: Optional[CoalesceOptions] = None):
         self.path = path
         self.stop_event = stop_event
-        self._writer = _Writer(path)
-        self._start_mono = time.monotonic()
+        sink = _BinaryWriter(path) if action_binary.is_binary_action(path) else _Writer(path)
+        # the writer takes the screen size for normalized coordinates from here
+        screen_geometry().invalidate_unwatched()
+        # the caller writes coalesce.meta_line() into the file header
+        self._writer = _AsyncWriter(sink, time.monotonic_ns(), coalesce)
         self.kb_thread: Optional[KeyboardRecorder] = None
         self.ms_thread: Optional[MouseRecorder] = None
 
     def start(self):
-        self.kb_thread = KeyboardRecorder(self._writer, self.stop_event, self._start_mono)
-        self.ms_thread = MouseRecorder(self._writer, self.stop_event, self._start_mono)
+        self._writer.start()
+        self.kb_thread = KeyboardRecorder(self._writer, self.stop_event)
+        self.ms_thread = MouseRecorder(self._writer, self.stop_event)
         self.kb_thread.start()
         self.ms_thread.start()
+        # flush buffered output however recording gets stopped (F10, ESC, window close); the
+        # watcher is a daemon thread, so interpreter exit also drains the writer via atexit
+        atexit.register(self._writer.close)
+        threading.Thread(target=self._close_on_stop, daemon=True).start()
+
+    def _close_on_stop(self):
+        self.stop_event.wait()
+        self._writer.close()
+        atexit.unregister(self._writer.close)
+
+    def hook_stats(self) -> dict:
+        """Hook callback cost in microseconds: {'keyboard'|'mouse': {'calls', 'mean_us', 'max_us'}}."""
+        out = {}
+        for name, th in (('keyboard', self.kb_thread), ('mouse', self.ms_thread)):
+            st = th.stats if th is not None else _HookStats()
+            out[name] = {
+                'calls': st.calls,
+                'mean_us': (st.total_ns / st.calls / 1000.0) if st.calls else 0.0,
+                'max_us': st.max_ns / 1000.0,
+            }
+        return out
+
+    def stop(self):
+        try:
+            self.stop_event.set()
+        except Exception:
+            pass
+        self._writer.close()
+        atexit.unregister(self._writer.close)
+        try:
+            logging.debug('recorder hook cost: %s', self.hook_stats())
+            if self._writer.coalescer is not None:
+                logging.debug('recorder coalesced away %d events', self._writer.coalescer.dropped)
+        except Exception:
+            pass
@@ -1,26 +1,44 @@
+import os
 import threading
 import time
-import json
-from pynput.keyboard import Controller as KeyBoardController, KeyCode
-from pynput.mouse import Button, Controller as MouseController
-from core.actions import parse_action_line
-from core.utils import wait_until_or_stop, get_screen_size
-
-# Optional: DirectInput-style relative mouse (works better in many games)
-try:
-    import pydirectinput as _pdi
-    _PDI_AVAILABLE = True
+from array import array
+from core.timeline import Timeline, stream_path, OP_KEY_DOWN, OP_KEY_UP, OP_MOVE, OP_CLICK_DOWN, OP_CLICK_UP, OP_SCROLL
+from core.action_binary import FLAG_NORM, is_binary_action
+from core.utils import get_screen_size
+from core.screen import screen_geometry
+from core.scheduler import make_scheduler
+from core.input_backend import make_backend
+from core import action_index
+
+# compiled step kinds (Replayer._compile); clicks carry (button << 1) | down in the last field
+STEP_KEY_DOWN, STEP_KEY_UP, STEP_SCROLL, STEP_MOVE, STEP_MOVE_REL, STEP_CLICK = range(6)
+# text files with at least this many events are streamed from disk instead of loaded up front
+STREAM_THRESHOLD_EVENTS = 250000
+# event count estimate for text files the action index has not fully counted yet
+TEXT_BYTES_PER_EVENT = 24
+
+
+def should_stream(path) -> bool:
+    """Default replay mode for a file.
+
+    .actionb files always stream: their blocks decode lazily, so loading them up front only
+    delays the first event. Text files stream once they hold STREAM_THRESHOLD_EVENTS events
+    (exact count from the action index when known, otherwise estimated from the size).
+    """
     try:
-        _pdi.PAUSE = 0
-        _pdi.FAILSAFE = False
+        if is_binary_action(path):
+            return True
+        counts = action_index.get_action_meta(path).get('counts')
+        if counts:
+            return sum(counts.values()) >= STREAM_THRESHOLD_EVENTS
+        return os.path.getsize(path) >= STREAM_THRESHOLD_EVENTS * TEXT_BYTES_PER_EVENT
     except Exception:
-        pass
-except Exception:
-    _PDI_AVAILABLE = False
+        return False
+
 
 
 class Replayer:
-    def __init__(self, path, stop_event_kb, stop_event_ms, infinite_event, repeat_count: int, use_relative_mouse: bool = False, relative_gain: float = 1.0, auto_detect: bool = False, progress_cb=None, loop_start_cb=None):
+    def __init__(self, path, stop_event_kb, stop_event_ms, infinite_event, repeat_count: int, use_relative_mouse: bool = False, relative_gain: float = 1.0, auto_detect: bool = False, progress_cb=None, loop_start_cb=None, streaming=None, scheduler=None, backend=None):
         self.path = path
         self.stop_event_kb = stop_event_kb
         self.stop_event_ms = stop_event_ms
@@ -33,126 +51,160 @@ class Replayer:
         self.progress_cb = progress_cb
         self.loop_start_cb = loop_start_cb
         self._runner = None
-        self._events = self._load_events(path)
+        # completion signal: set once _run has released keys and set the stop events
+        self.done = threading.Event()
+        # 'hybrid' (default) / 'sleep' or a core.scheduler.Scheduler instance
+        self.scheduler = make_scheduler(scheduler)
+        # backend name (see core.input_backend.BACKENDS) or instance; created on the replay thread
+        self._backend_spec = backend
+        self.backend = None
+        if streaming is None:
+            streaming = should_stream(path)
+        self.streaming = bool(streaming)
+        # streaming mode parses lazily on every loop; nothing is held in memory
+        self._timeline = None if self.streaming else self._load_timeline(path)
         self._pressed_vks = set()
+        self._compiled = None
+        self.loop_start_ts = 0.0
 
-    def _load_events(self, path):
-        events = []
+    def _load_timeline(self, path):
         try:
-            with open(path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    s = line.strip()
-                    if not s or s.startswith('#'):
-                        continue
-                    d = parse_action_line(s)
-                    t_ms = int(d.get('ms') or 0) if d.get('ms') not in (None, '') else 0
-                    events.append((t_ms, d))
+            timeline = Timeline.from_path(path)
         except Exception:
-            pass
-        events.sort(key=lambda x: x[0])
-        return events
+            return Timeline()
+        # the file is fully parsed here anyway: cache exact counts/duration for next time
+        action_index.record_timeline(path, timeline)
+        return timeline.sorted()
 
-    def _dispatch_vk(self, kb, d):
+    def _iter_events(self):
+        if self._timeline is not None:
+            yield from self._timeline
+            return
         try:
-            vk = int(d.get('vk') or 0)
-            if d.get('op') == 'DOWN':
-                kb.press(KeyCode.from_vk(vk))
-                self._pressed_vks.add(vk)
-            elif d.get('op') == 'UP':
-                kb.release(KeyCode.from_vk(vk))
-                self._pressed_vks.discard(vk)
+            yield from stream_path(self.path)
         except Exception:
-            pass
+            return
+
+    def _key_down(self, vk):
+        self.backend.press(vk)
+        self._pressed_vks.add(vk)
+
+    def _key_up(self, vk):
+        self.backend.release(vk)
+        self._pressed_vks.discard(vk)
+
+    def _record_screen(self):
+        """(w, h) from META SCREEN, or None."""
+        try:
+            if self._timeline is not None:
+                parts = self._timeline.meta('SCREEN')
+                return int(parts[0]), int(parts[1])
+            w, h = action_index.get_action_meta(self.path).get('screen', '').split('x')
+            return int(w), int(h)
+        except Exception:
+            return None
+
+    def _compile(self, records, screen_wh):
+        """Yield (deadline_s, step, a, b, c) for the given screen and mouse mode.
 
-    def _dispatch_ms(self, ms_ctrl, d, screen_wh, rel_state):
+        Normalized coordinates are used only when the recording's META SCREEN differs from
+        the current screen by more than 2%. Relative-mode deltas (with residual carry) are
+        worked out here, so moves that round to zero never reach the hot loop. Steps are
+        plain numbers (see STEP_*), so memory mode can keep them in array columns.
+        """
         cw, ch = screen_wh
-        rw, rh = rel_state.get('rw_ch', (cw, ch))
-        op = (d.get('op') or '').upper()
-        if op == 'MOVE':
-            try:
-                x = int(d.get('x') or 0); y = int(d.get('y') or 0)
-            except Exception:
-                x = y = 0
-            nx = d.get('nx'); ny = d.get('ny')
-            use_norm = False
-            try:
-                if rw and rh and (abs(cw - rw)/float(rw) > 0.02 or abs(ch - rh)/float(rh) > 0.02):
-                    use_norm = (nx not in (None,'') and ny not in (None,''))
-            except Exception:
-                use_norm = False
-            tx = int(round(float(nx) * float(cw))) if use_norm else x
-            ty = int(round(float(ny) * float(ch))) if use_norm else y
-            if self.use_relative_mouse:
-                # relative: use recorded deltas with gain
-                prev = rel_state.get('prev')
+        rec_wh = self._record_screen()
+        use_norm = False
+        if rec_wh:
+            rw, rh = rec_wh
+            use_norm = bool(rw and rh and (abs(cw - rw) / float(rw) > 0.02 or abs(ch - rh) / float(rh) > 0.02))
+        relative = self.use_relative_mouse
+        gain = self.relative_gain
+        prev = None
+        resx = resy = 0.0
+        for op, btn, flags, x, y, nx, ny, t_ms in records:
+            t_s = t_ms / 1000.0
+            if op == OP_KEY_DOWN:
+                yield t_s, STEP_KEY_DOWN, x, 0, 0
+                continue
+            if op == OP_KEY_UP:
+                yield t_s, STEP_KEY_UP, x, 0, 0
+                continue
+            if op == OP_SCROLL:
+                yield t_s, STEP_SCROLL, x, y, 0
+                continue
+            if use_norm and flags & FLAG_NORM:
+                tx, ty = int(round(nx * cw)), int(round(ny * ch))
+            else:
+                tx, ty = x, y
+            if op == OP_MOVE:
+                if not relative:
+                    yield t_s, STEP_MOVE, tx, ty, 0
+                    continue
+                # relative: recorded deltas with gain
                 if prev is None:
-                    rel_state['prev'] = (x, y)
-                    return
-                px, py = prev
-                fdx = (x - px) * self.relative_gain + rel_state.get('resx', 0.0)
-                fdy = (y - py) * self.relative_gain + rel_state.get('resy', 0.0)
+                    prev = (x, y)
+                    continue
+                fdx = (x - prev[0]) * gain + resx
+                fdy = (y - prev[1]) * gain + resy
                 dx = int(round(fdx)); dy = int(round(fdy))
-                rel_state['resx'] = fdx - dx
-                rel_state['resy'] = fdy - dy
+                resx = fdx - dx
+                resy = fdy - dy
+                prev = (x, y)
                 if dx != 0 or dy != 0:
-                    if _PDI_AVAILABLE:
-                        try:
-                            _pdi.moveRel(dx, dy, duration=0, relative=True)
-                        except Exception:
-                            try:
-                                ms_ctrl.move(dx, dy)
-                            except Exception:
-                                pass
-                    else:
-                        try:
-                            ms_ctrl.move(dx, dy)
-                        except Exception:
-                            pass
-                rel_state['prev'] = (x, y)
-            else:
-                try:
-                    ms_ctrl.position = (tx, ty)
-                except Exception:
-                    pass
-        elif op == 'CLICK':
-            btn = d.get('btn') or 'left'; act = d.get('act') or 'DOWN'
-            try:
-                x = int(d.get('x') or 0); y = int(d.get('y') or 0)
-            except Exception:
-                x = y = 0
-            nx = d.get('nx'); ny = d.get('ny')
-            use_norm = False
-            try:
-                if rw and rh and (abs(cw - rw)/float(rw) > 0.02 or abs(ch - rh)/float(rh) > 0.02):
-                    use_norm = (nx not in (None,'') and ny not in (None,''))
-            except Exception:
-                use_norm = False
-            tx = int(round(float(nx) * float(cw))) if use_norm else x
-            ty = int(round(float(ny) * float(ch))) if use_norm else y
-            try:
-                ms_ctrl.position = (tx, ty)
-            except Exception:
-                pass
-            if act == 'DOWN':
-                if btn == 'left': ms_ctrl.press(Button.left)
-                else: ms_ctrl.press(Button.right)
+                    yield t_s, STEP_MOVE_REL, dx, dy, 0
+            elif op in (OP_CLICK_DOWN, OP_CLICK_UP):
+                yield t_s, STEP_CLICK, tx, ty, (btn << 1) | (op == OP_CLICK_DOWN)
+
+    def _bind(self, steps):
+        """(deadline_s, callable, args) for the hot loop, bound to this replay's backend."""
+        backend = self.backend
+        fns = (self._key_down, self._key_up, backend.scroll, backend.move, backend.move_rel)
+        click_at = backend.click_at
+        for t_s, step, a, b, c in steps:
+            if step == STEP_CLICK:
+                yield t_s, click_at, (c >> 1, bool(c & 1), a, b)
+            elif step <= STEP_KEY_UP:
+                yield t_s, fns[step], (a,)
             else:
-                if btn == 'left': ms_ctrl.release(Button.left)
-                else: ms_ctrl.release(Button.right)
-        elif op == 'SCROLL':
-            try:
-                dx = int(d.get('dx') or 0); dy = int(d.get('dy') or 0)
-            except Exception:
-                dx = dy = 0
+                yield t_s, fns[step], (a, b)
+
+    def _program(self, screen_wh):
+        """Steps for this loop; in memory mode compiled once into array columns (about 18
+        bytes per event) and reused until the geometry changes."""
+        if self._timeline is None:
+            return self._bind(self._compile(self._iter_events(), screen_wh))
+        key = (screen_wh, screen_geometry().version)
+        if self._compiled is None or self._compiled[0] != key:
+            cols = (array('d'), array('B'), array('i'), array('i'), array('B'))
+            add_t, add_step, add_a, add_b, add_c = (c.append for c in cols)
+            for t_s, step, a, b, c in self._compile(self._timeline, screen_wh):
+                add_t(t_s); add_step(step); add_a(a); add_b(b); add_c(c)
+            self._compiled = (key, cols)
+        return self._bind(zip(*self._compiled[1]))
+
+    def timing_stats(self) -> dict:
+        """Per-event lateness summary (ms) of the current/last replay."""
+        return self.scheduler.stats.summary()
+
+    def _run(self):
+        try:
+            self._play()
+        finally:
             try:
-                ms_ctrl.scroll(dx, dy)
+                self.stop_event_kb.set()
+                self.stop_event_ms.set()
             except Exception:
                 pass
+            self.done.set()
 
-    def _run(self):
-        kb = KeyBoardController()
-        ms_ctrl = MouseController()
+    def _play(self):
+        backend = self.backend = make_backend(self._backend_spec)
+        tick = backend.tick
         loop_idx = 0
+        scheduler = self.scheduler
+        scheduler.stats.reset()
+        scheduler.begin()
         while True:
             if self.stop_event_kb.is_set() or self.stop_event_ms.is_set():
                 break
@@ -163,19 +215,25 @@ class Replayer:
                     self.loop_start_cb(loop_idx, self.total_loops)
             except Exception:
                 pass
-            cw, ch = get_screen_size()
-            rel_state = {'prev': None, 'resx': 0.0, 'resy': 0.0, 'rw_ch': (cw, ch)}
+            program = self._program(get_screen_size())
             start_ts = time.monotonic()
-            for t_ms, d in self._events:
-                if self.stop_event_kb.is_set() or self.stop_event_ms.is_set():
-                    break
-                target = start_ts + (t_ms/1000.0)
-                if not wait_until_or_stop(target, self.stop_event_kb):
+            self.loop_start_ts = start_ts
+            stop_kb, stop_ms = self.stop_event_kb, self.stop_event_ms
+            for t_s, fn, args in program:
+                if stop_kb.is_set() or stop_ms.is_set():
                     break
-                if d.get('type') == 'VK':
-                    self._dispatch_vk(kb, d)
-                elif d.get('type') == 'MS':
-                    self._dispatch_ms(ms_ctrl, d, (cw, ch), rel_state)
+                target = start_ts + t_s
+                # batching backends take events due within one tick without waiting
+                if not tick or target - time.monotonic() > tick:
+                    backend.flush()
+                    if not scheduler.wait_until(target, stop_kb):
+                        break
+                try:
+                    fn(*args)
+                except Exception:
+                    pass
+            backend.flush()
+            program.close()
             try:
                 if callable(self.progress_cb):
                     self.progress_cb(loop_idx, self.total_loops)
@@ -188,24 +246,29 @@ class Replayer:
             self.repeat_count -= 1
             if self.repeat_count <= 0:
                 break
+        scheduler.end()
         # release any keys left pressed to avoid影响下一轮
         try:
             for vk in list(self._pressed_vks):
                 try:
-                    kb.release(KeyCode.from_vk(vk))
+                    backend.release(vk)
                 except Exception:
                     pass
             self._pressed_vks.clear()
-        except Exception:
-            pass
-        try:
-            self.stop_event_kb.set()
-            self.stop_event_ms.set()
+            backend.close()
         except Exception:
             pass
 
     def start(self):
         if self._runner and self._runner.is_alive():
             return
+        screen_geometry().invalidate_unwatched()
+        self.done.clear()
         self._runner = threading.Thread(target=self._run, daemon=True)
         self._runner.start()
+
+    def wait(self, timeout=None) -> bool:
+        """Block until the replay has finished (or was stopped); False on timeout."""
+        if self._runner is None:
+            return True
+        return self.done.wait(timeout)
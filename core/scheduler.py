@@ -0,0 +1,175 @@
+"""Replay schedulers: wait for an event's deadline and record how late it fired.
+
+HybridScheduler waits coarsely on the stop event (so stopping is immediate) until
+shortly before the deadline, then finishes with a short spin or a high-resolution
+sleep. SleepScheduler is the old fixed-quantum loop, kept for comparison.
+"""
+import ctypes
+import os
+import threading
+import time
+from array import array
+
+from core.utils import wait_until_or_stop
+
+
+# samples kept for percentiles; count/mean/max cover every event
+STATS_WINDOW = 100000
+
+
+class LatenessStats:
+    """Lateness (seconds past the deadline) of dispatched events."""
+
+    def __init__(self, window: int = STATS_WINDOW):
+        self.window = int(window)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._ring = array('d')
+            self._pos = 0
+            self.count = 0
+            self.total = 0.0
+            self.max = 0.0
+
+    def add(self, late_s: float):
+        with self._lock:
+            if len(self._ring) < self.window:
+                self._ring.append(late_s)
+            else:
+                self._ring[self._pos] = late_s
+                self._pos = (self._pos + 1) % self.window
+            self.count += 1
+            self.total += late_s
+            if late_s > self.max:
+                self.max = late_s
+
+    def samples(self):
+        with self._lock:
+            return list(self._ring)
+
+    def summary(self) -> dict:
+        """Milliseconds: count, mean, p50, p95, p99, max."""
+        vals = sorted(self.samples())
+
+        def pct(p):
+            if not vals:
+                return 0.0
+            return vals[min(len(vals) - 1, int(round(p / 100.0 * (len(vals) - 1))))] * 1000.0
+
+        return {
+            'count': self.count,
+            'mean_ms': (self.total / self.count * 1000.0) if self.count else 0.0,
+            'p50_ms': pct(50),
+            'p95_ms': pct(95),
+            'p99_ms': pct(99),
+            'max_ms': self.max * 1000.0,
+        }
+
+
+class Scheduler:
+    name = 'base'
+
+    def __init__(self):
+        self.stats = LatenessStats()
+
+    def begin(self):
+        """Called once before a replay starts."""
+        pass
+
+    def end(self):
+        """Called once after a replay ends."""
+        pass
+
+    def _wait(self, deadline: float, stop_event) -> bool:
+        raise NotImplementedError
+
+    def wait_until(self, deadline: float, stop_event) -> bool:
+        """Block until time.monotonic() >= deadline. Returns False if stop_event was set."""
+        if not self._wait(deadline, stop_event):
+            return False
+        self.stats.add(max(0.0, time.monotonic() - deadline))
+        return True
+
+
+class SleepScheduler(Scheduler):
+    """Legacy behaviour: sleep in fixed slices (up to `quantum` late)."""
+    name = 'sleep'
+
+    def __init__(self, quantum: float = 0.01):
+        super().__init__()
+        self.quantum = float(quantum)
+
+    def _wait(self, deadline, stop_event):
+        return wait_until_or_stop(deadline, stop_event, self.quantum)
+
+
+class HybridScheduler(Scheduler):
+    """Event.wait() until `margin` before the deadline, then spin (spin=True) or hi-res sleep.
+
+    Windows timers tick every ~15.6 ms unless the resolution is raised, so begin()/end()
+    bracket the replay with timeBeginPeriod(1)/timeEndPeriod(1) and the default margin
+    there is larger. On Linux time.sleep() already uses clock_nanosleep.
+    """
+    name = 'hybrid'
+
+    def __init__(self, margin: float = None, spin: bool = True):
+        super().__init__()
+        if margin is None:
+            margin = 0.003 if os.name == 'nt' else 0.002
+        self.margin = float(margin)
+        self.spin = bool(spin)
+        self._timer_period = False
+
+    def begin(self):
+        if os.name != 'nt' or self._timer_period:
+            return
+        try:
+            self._timer_period = ctypes.windll.winmm.timeBeginPeriod(1) == 0
+        except Exception:
+            self._timer_period = False
+
+    def end(self):
+        if not self._timer_period:
+            return
+        try:
+            ctypes.windll.winmm.timeEndPeriod(1)
+        except Exception:
+            pass
+        self._timer_period = False
+
+    def _wait(self, deadline, stop_event):
+        try:
+            remaining = deadline - time.monotonic()
+            if remaining > self.margin:
+                if stop_event.wait(remaining - self.margin):
+                    return False
+            if stop_event.is_set():
+                return False
+            if not self.spin:
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    time.sleep(remaining)
+                return not stop_event.is_set()
+            while time.monotonic() < deadline:
+                if stop_event.is_set():
+                    return False
+                time.sleep(0)  # yield the GIL to the UI/listener threads
+            return True
+        except Exception:
+            return False
+
+
+SCHEDULERS = {
+    'hybrid': HybridScheduler,
+    'sleep': SleepScheduler,
+}
+
+
+def make_scheduler(spec=None, **kwargs) -> Scheduler:
+    """Scheduler instance from an instance, a name in SCHEDULERS or None (hybrid)."""
+    if isinstance(spec, Scheduler):
+        return spec
+    cls = SCHEDULERS.get(str(spec or 'hybrid').lower(), HybridScheduler)
+    return cls(**kwargs)
@@ -0,0 +1,218 @@
+"""Cached screen geometry shared by recorder, replayer and UI.
+
+Probe order: QUICKMACRO_SCREEN=WxH, Win32, Xlib via ctypes, a throwaway
+tkinter.Tk root (skipped after set_tk_probe(False), as the headless CLI does),
+then DEFAULT_GEOMETRY. The result is cached until invalidate() is called. On Windows a hidden window
+listens for WM_DISPLAYCHANGE / WM_SETTINGCHANGE / WM_DPICHANGED and
+invalidates automatically; elsewhere recordings and replays call
+invalidate_unwatched() when they start. `version` increases whenever the geometry actually
+changes, so callers can cheaply tell whether derived data is stale.
+"""
+import ctypes
+import os
+import threading
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Geometry:
+    width: int
+    height: int
+    dpi: float = 96.0
+    # virtual desktop (all monitors); origin can be negative on Windows
+    origin_x: int = 0
+    origin_y: int = 0
+    virtual_width: int = 0
+    virtual_height: int = 0
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+
+DEFAULT_GEOMETRY = Geometry(1920, 1080, 96.0, 0, 0, 1920, 1080)
+ENV_SCREEN = 'QUICKMACRO_SCREEN'
+_tk_probe = True
+
+
+def set_tk_probe(enabled: bool) -> None:
+    """Allow or forbid the tkinter fallback probe (headless runs must not load Tk)."""
+    global _tk_probe
+    _tk_probe = bool(enabled)
+
+
+def parse_size(text) -> Geometry:
+    """'1920x1080' -> Geometry; raises ValueError."""
+    w, h = (int(v) for v in str(text).lower().replace('*', 'x').split('x'))
+    if w <= 0 or h <= 0:
+        raise ValueError(f'bad screen size: {text!r}')
+    return Geometry(w, h, 96.0, 0, 0, w, h)
+
+
+def _probe_env() -> Geometry:
+    return parse_size(os.environ[ENV_SCREEN])
+
+
+def _probe_windows() -> Geometry:
+    user32 = ctypes.windll.user32
+    w, h = int(user32.GetSystemMetrics(0)), int(user32.GetSystemMetrics(1))
+    dpi = 96.0
+    try:
+        dpi = float(user32.GetDpiForSystem())
+    except Exception:
+        pass
+    # SM_XVIRTUALSCREEN .. SM_CYVIRTUALSCREEN
+    vx, vy = int(user32.GetSystemMetrics(76)), int(user32.GetSystemMetrics(77))
+    vw, vh = int(user32.GetSystemMetrics(78)), int(user32.GetSystemMetrics(79))
+    return Geometry(w, h, dpi, vx, vy, vw or w, vh or h)
+
+
+def _probe_x11() -> Geometry:
+    import ctypes.util
+    if not os.environ.get('DISPLAY'):
+        raise OSError('no DISPLAY')
+    xlib = ctypes.CDLL(ctypes.util.find_library('X11') or 'libX11.so.6')
+    xlib.XOpenDisplay.restype = ctypes.c_void_p
+    xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+    for fn in (xlib.XDefaultScreen, xlib.XCloseDisplay):
+        fn.argtypes = [ctypes.c_void_p]
+    for fn in (xlib.XDisplayWidth, xlib.XDisplayHeight, xlib.XDisplayWidthMM):
+        fn.argtypes = [ctypes.c_void_p, ctypes.c_int]
+    dpy = xlib.XOpenDisplay(None)
+    if not dpy:
+        raise OSError('cannot open display')
+    try:
+        scr = xlib.XDefaultScreen(dpy)
+        w, h = int(xlib.XDisplayWidth(dpy, scr)), int(xlib.XDisplayHeight(dpy, scr))
+        mm = int(xlib.XDisplayWidthMM(dpy, scr))
+        dpi = w * 25.4 / mm if mm > 0 else 96.0
+        return Geometry(w, h, dpi, 0, 0, w, h)
+    finally:
+        xlib.XCloseDisplay(dpy)
+
+
+def _probe_tk() -> Geometry:
+    import tkinter
+    t = tkinter.Tk()
+    try:
+        w = int(t.winfo_screenwidth())
+        h = int(t.winfo_screenheight())
+        try:
+            dpi = float(t.winfo_fpixels('1i'))
+        except Exception:
+            dpi = 96.0
+        return Geometry(w, h, dpi, 0, 0, w, h)
+    finally:
+        t.destroy()
+
+
+def _probe() -> Geometry:
+    probes = [_probe_env, _probe_windows if os.name == 'nt' else _probe_x11]
+    if _tk_probe:
+        probes.append(_probe_tk)
+    for probe in probes:
+        try:
+            return probe()
+        except Exception:
+            pass
+    return DEFAULT_GEOMETRY
+
+
+class ScreenGeometryProvider:
+    def __init__(self, probe=_probe):
+        self._probe = probe
+        self._lock = threading.Lock()
+        self._geometry = None
+        self._last = None
+        self.version = 0
+        self._watcher = None
+
+    def get(self) -> Geometry:
+        g = self._geometry
+        if g is not None:
+            return g
+        with self._lock:
+            if self._geometry is None:
+                g = self._probe()
+                if g != self._last:
+                    self.version += 1
+                self._last = g
+                self._geometry = g
+            return self._geometry
+
+    def size(self):
+        return self.get().size
+
+    def invalidate(self) -> None:
+        """Drop the cached value; the next get() probes again."""
+        with self._lock:
+            self._geometry = None
+
+    def invalidate_unwatched(self) -> None:
+        """Session boundary (recording or replay start): without a running change watcher
+        nothing else notices a resolution change, so probe again on the next get()."""
+        w = self._watcher
+        if w is None or not w.is_alive():
+            self.invalidate()
+
+    def start_watcher(self) -> None:
+        """Invalidate on display/DPI change notifications (Windows only; no-op elsewhere)."""
+        if os.name != 'nt' or self._watcher is not None:
+            return
+        self._watcher = threading.Thread(target=self._watch_windows, daemon=True)
+        self._watcher.start()
+
+    def _watch_windows(self):
+        try:
+            from ctypes import wintypes
+            user32 = ctypes.WinDLL('user32', use_last_error=True)
+            kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+            LRESULT = ctypes.c_ssize_t
+            WNDPROC = ctypes.WINFUNCTYPE(LRESULT, wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM)
+            user32.DefWindowProcW.argtypes = [wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM]
+            user32.DefWindowProcW.restype = LRESULT
+            WM_SETTINGCHANGE, WM_DISPLAYCHANGE, WM_DPICHANGED = 0x001A, 0x007E, 0x02E0
+
+            def proc(hwnd, msg, wparam, lparam):
+                if msg in (WM_DISPLAYCHANGE, WM_SETTINGCHANGE, WM_DPICHANGED):
+                    self.invalidate()
+                return user32.DefWindowProcW(hwnd, msg, wparam, lparam)
+
+            class WNDCLASSW(ctypes.Structure):
+                _fields_ = [('style', wintypes.UINT), ('lpfnWndProc', WNDPROC),
+                            ('cbClsExtra', ctypes.c_int), ('cbWndExtra', ctypes.c_int),
+                            ('hInstance', wintypes.HINSTANCE), ('hIcon', wintypes.HICON),
+                            ('hCursor', wintypes.HANDLE), ('hbrBackground', wintypes.HBRUSH),
+                            ('lpszMenuName', wintypes.LPCWSTR), ('lpszClassName', wintypes.LPCWSTR)]
+
+            self._wndproc = WNDPROC(proc)  # must outlive the window
+            kernel32.GetModuleHandleW.restype = wintypes.HMODULE
+            hinst = kernel32.GetModuleHandleW(None)
+            wc = WNDCLASSW()
+            wc.lpfnWndProc = self._wndproc
+            wc.hInstance = hinst
+            wc.lpszClassName = 'QuickMacroDisplayWatch'
+            user32.RegisterClassW(ctypes.byref(wc))
+            user32.CreateWindowExW.restype = wintypes.HWND
+            user32.CreateWindowExW.argtypes = [wintypes.DWORD, wintypes.LPCWSTR, wintypes.LPCWSTR, wintypes.DWORD,
+                                               ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+                                               wintypes.HWND, wintypes.HMENU, wintypes.HINSTANCE, wintypes.LPVOID]
+            # a hidden top-level window (message-only windows do not get broadcasts)
+            hwnd = user32.CreateWindowExW(0, wc.lpszClassName, wc.lpszClassName, 0, 0, 0, 0, 0, None, None, hinst, None)
+            if not hwnd:
+                return
+            msg = wintypes.MSG()
+            while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+                user32.TranslateMessage(ctypes.byref(msg))
+                user32.DispatchMessageW(ctypes.byref(msg))
+        except Exception:
+            pass
+
+
+_provider = ScreenGeometryProvider()
+
+
+def screen_geometry() -> ScreenGeometryProvider:
+    """Process-wide provider; starts the change watcher on first use."""
+    _provider.start_watcher()
+    return _provider
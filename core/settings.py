@@ -1,7 +1,7 @@
 from dataclasses import dataclass, asdict
 import json
 import os
-from typing import Dict
+from typing import Dict, Optional
 
 
 DEFAULT_PATH = 'settings.json'
@@ -15,6 +15,14 @@ class Settings:
     game_mode_relative: bool = False
     game_mode_gain: float = 1.0
     game_mode_auto: bool = True
+    record_binary: bool = False
+    coalesce_move_ms: int = 0
+    coalesce_move_px: int = 0
+    coalesce_scroll_ms: int = 0
+    coalesce_key_repeat: bool = False
+    warmup_imports: bool = True
+    # None: pick per file (see core.replayer.should_stream); true/false forces streaming on/off
+    replay_streaming: Optional[bool] = None
 
     @staticmethod
     def load(path: str = DEFAULT_PATH) -> 'Settings':
@@ -29,6 +37,13 @@ class Settings:
                         game_mode_relative=bool(data.get('game_mode_relative', False)),
                         game_mode_gain=float(data.get('game_mode_gain', 1.0) or 1.0),
                         game_mode_auto=bool(data.get('game_mode_auto', True)),
+                        record_binary=bool(data.get('record_binary', False)),
+                        coalesce_move_ms=int(data.get('coalesce_move_ms', 0) or 0),
+                        coalesce_move_px=int(data.get('coalesce_move_px', 0) or 0),
+                        coalesce_scroll_ms=int(data.get('coalesce_scroll_ms', 0) or 0),
+                        coalesce_key_repeat=bool(data.get('coalesce_key_repeat', False)),
+                        warmup_imports=bool(data.get('warmup_imports', True)),
+                        replay_streaming=None if data.get('replay_streaming') is None else bool(data.get('replay_streaming')),
                     )
         except Exception:
             pass
@@ -56,6 +71,13 @@ def save_settings(data: Dict, path: str = DEFAULT_PATH) -> None:
             game_mode_relative=bool(data.get('game_mode_relative', False)),
             game_mode_gain=float(data.get('game_mode_gain', 1.0) or 1.0),
             game_mode_auto=bool(data.get('game_mode_auto', True)),
+            record_binary=bool(data.get('record_binary', False)),
+            coalesce_move_ms=int(data.get('coalesce_move_ms', 0) or 0),
+            coalesce_move_px=int(data.get('coalesce_move_px', 0) or 0),
+            coalesce_scroll_ms=int(data.get('coalesce_scroll_ms', 0) or 0),
+            coalesce_key_repeat=bool(data.get('coalesce_key_repeat', False)),
+            warmup_imports=bool(data.get('warmup_imports', True)),
+            replay_streaming=None if data.get('replay_streaming') is None else bool(data.get('replay_streaming')),
         )
         s.save(path)
     except Exception:
@@ -0,0 +1,101 @@
+# save as simplify_action.py
+import os
+
+import numpy as np
+
+from core.timeline import Timeline, OP_MOVE
+
+
+def _seg_dist(px, py, ax, ay, bx, by):
+    # 点到线段的距离（向量化）；线段退化成点时就是点距
+    dx = bx - ax
+    dy = by - ay
+    ll = dx * dx + dy * dy
+    with np.errstate(invalid='ignore', divide='ignore'):
+        u = np.where(ll > 0, ((px - ax) * dx + (py - ay) * dy) / np.where(ll > 0, ll, 1), 0.0)
+    u = np.clip(u, 0.0, 1.0)
+    return np.hypot(px - (ax + u * dx), py - (ay + u * dy))
+
+
+def _rdp_keep(xs, ys, keep, epsilon):
+    # Ramer–Douglas–Peucker，按层推进：每轮对所有未定的点一次性算到所在线段的距离，
+    # 每段取最远点，超过 epsilon 就保留并把该段一分为二；keep 中已为 True 的点是各段端点
+    while True:
+        unk = np.flatnonzero(~keep)
+        if not len(unk):
+            return
+        kept = np.flatnonzero(keep)
+        j = np.searchsorted(kept, unk)
+        a = kept[j - 1]
+        b = kept[j]
+        d = _seg_dist(xs[unk], ys[unk], xs[a], ys[a], xs[b], ys[b])
+        first = np.flatnonzero(np.r_[True, a[1:] != a[:-1]])
+        seg_max = np.maximum.reduceat(d, first)
+        lens = np.diff(np.r_[first, len(unk)])
+        hit = np.flatnonzero((d == np.repeat(seg_max, lens)) & (d > epsilon))
+        if not len(hit):
+            return
+        # 同一段有多个并列最远点时只取第一个
+        hit = hit[np.r_[True, a[hit[1:]] != a[hit[:-1]]]]
+        keep[unk[hit]] = True
+
+
+def simplify_moves(timeline: Timeline, epsilon_px: float = 1.0):
+    # 只处理连续的 M MOVE 段（被任意点击/滚轮/按键隔开）；段首尾、非移动事件及其时间戳原样保留
+    timeline = timeline.sorted()
+    n = len(timeline)
+    op = np.frombuffer(timeline.op, dtype=np.uint8) if n else np.zeros(0, np.uint8)
+    xs = np.asarray(timeline.x, dtype=np.float64)
+    ys = np.asarray(timeline.y, dtype=np.float64)
+    is_move = op == OP_MOVE
+    prev_move = np.r_[False, is_move[:-1]]
+    next_move = np.r_[is_move[1:], False]
+    run_edge = is_move & ~(prev_move & next_move)
+    # 与前一点坐标完全相同的移动直接去掉（段尾除外），剩下的点再做 RDP
+    same = is_move & prev_move & ~run_edge
+    same[1:] &= (xs[1:] == xs[:-1]) & (ys[1:] == ys[:-1])
+    cand = np.flatnonzero(is_move & ~same)
+    cand_keep = run_edge[cand]
+    _rdp_keep(xs[cand], ys[cand], cand_keep, epsilon_px)
+    keep = ~is_move
+    keep[cand[cand_keep]] = True
+    # 被删掉的点到其前后保留点连线的距离 = 回放时的最大位置误差
+    max_err = 0.0
+    dropped = np.nonzero(~keep)[0]
+    if len(dropped):
+        kept_moves = np.nonzero(keep & is_move)[0]
+        j = np.searchsorted(kept_moves, dropped)
+        a = kept_moves[j - 1]
+        b = kept_moves[j]
+        err = _seg_dist(xs[dropped], ys[dropped], xs[a], ys[a], xs[b], ys[b])
+        max_err = float(err.max())
+    out = timeline.take(np.nonzero(keep)[0].tolist())
+    report = {
+        'events_before': n,
+        'events_after': len(out),
+        'moves_before': int(is_move.sum()),
+        'moves_after': int((keep & is_move).sum()),
+        'max_error_px': round(max_err, 3),
+    }
+    return out, report
+
+
+def simplify_action(src_path: str, dst_path: str, epsilon_px: float = 1.0) -> dict:
+    timeline, report = simplify_moves(Timeline.from_path(src_path), epsilon_px)
+    timeline.save(dst_path)
+    report['bytes_before'] = os.path.getsize(src_path)
+    report['bytes_after'] = os.path.getsize(dst_path)
+    return report
+
+
+if __name__ == '__main__':
+    # 用法：python -m core.simplify_action <src> <dst> [epsilon_px]
+    import sys
+    if len(sys.argv) < 3:
+        print('usage: python -m core.simplify_action <src> <dst> [epsilon_px]')
+        sys.exit(2)
+    eps = float(sys.argv[3]) if len(sys.argv) > 3 else 1.0
+    r = simplify_action(sys.argv[1], sys.argv[2], eps)
+    ratio = (r['bytes_after'] / r['bytes_before']) if r['bytes_before'] else 1.0
+    print(f"events {r['events_before']} -> {r['events_after']} (moves {r['moves_before']} -> {r['moves_after']})")
+    print(f"size {r['bytes_before']} -> {r['bytes_after']} bytes ({ratio:.1%}), max error {r['max_error_px']} px")
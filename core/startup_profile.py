@@ -0,0 +1,176 @@
+"""Startup timeline for `python QuickMacro.py --profile-startup`.
+
+enable() installs a sys.meta_path finder that times every newly imported
+module, however it is imported (`import a.b`, `from a import b`,
+importlib.import_module), as self/cumulative time like `-X importtime`; phase(name) and mark(name) record the app's own
+startup steps. finish() is called once the Tk main loop first goes idle: it
+removes the hook, prints a report sorted by cost and writes REPORT_PATH.
+Everything is a no-op unless enable() was called.
+"""
+import contextlib
+import json
+import sys
+import threading
+import time
+
+REPORT_PATH = 'startup_profile.json'
+TOP_IMPORTS = 25
+
+_profile = None
+
+
+class _TimedLoader:
+    """Wraps a module's loader for one exec_module() call; everything else is delegated."""
+
+    def __init__(self, loader, profile, find_s):
+        self._loader = loader
+        self._profile = profile
+        self._find_s = find_s
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        # the module keeps its real loader (importlib.resources, reload, get_data)
+        try:
+            module.__loader__ = self._loader
+            module.__spec__.loader = self._loader
+        except Exception:
+            pass
+        self._profile._timed(module.__name__, self._find_s, self._loader.exec_module, module)
+
+
+class _TimingFinder:
+    """First entry on sys.meta_path: asks the remaining finders and times the load."""
+
+    def __init__(self, profile):
+        self.profile = profile
+
+    def find_spec(self, name, path=None, target=None):
+        t0 = time.perf_counter()
+        spec = None
+        for finder in list(sys.meta_path):
+            find = getattr(finder, 'find_spec', None)
+            if finder is self or find is None:
+                continue
+            spec = find(name, path, target)
+            if spec is not None:
+                break
+        if spec is None or spec.loader is None or not hasattr(spec.loader, 'exec_module'):
+            return spec
+        spec.loader = _TimedLoader(spec.loader, self.profile, time.perf_counter() - t0)
+        return spec
+
+
+class StartupProfile:
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.phases = []  # (name, start_s, duration_s); duration 0 for marks
+        self.imports = []  # (module, self_s, cumulative_s)
+        self._local = threading.local()
+        self._finder = None
+
+    def install(self):
+        self._finder = _TimingFinder(self)
+        sys.meta_path.insert(0, self._finder)
+
+    def uninstall(self):
+        try:
+            sys.meta_path.remove(self._finder)
+        except ValueError:
+            pass
+        self._finder = None
+
+    def _timed(self, name, find_s, fn, *args):
+        """Run a module body, recording (name, self, cumulative) with nested imports subtracted."""
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(0.0)
+        t0 = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            cum = time.perf_counter() - t0 + find_s
+            child = stack.pop()
+            if stack:
+                stack[-1] += cum
+            self.imports.append((name, cum - child, cum))
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, t0 - self.t0, time.perf_counter() - t0))
+
+    def mark(self, name):
+        self.phases.append((name, time.perf_counter() - self.t0, 0.0))
+
+    def as_dict(self):
+        total = time.perf_counter() - self.t0
+        return {
+            'total_ms': total * 1000.0,
+            'phases': [{'name': n, 'start_ms': s * 1000.0, 'duration_ms': d * 1000.0} for n, s, d in sorted(self.phases, key=lambda p: p[1])],
+            'imports': [{'module': m, 'self_ms': s * 1000.0, 'cumulative_ms': c * 1000.0}
+                        for m, s, c in sorted(self.imports, key=lambda i: -i[2])],
+        }
+
+    def report(self) -> str:
+        data = self.as_dict()
+        lines = [f"Startup: {data['total_ms']:.1f} ms to interactive", '', 'Timeline:']
+        for p in data['phases']:
+            dur = f"{p['duration_ms']:9.1f} ms" if p['duration_ms'] else '        mark'
+            lines.append(f"  {p['start_ms']:9.1f} ms  {dur}  {p['name']}")
+        lines += ['', 'Phases by cost:']
+        for p in sorted(data['phases'], key=lambda p: -p['duration_ms']):
+            if p['duration_ms']:
+                lines.append(f"  {p['duration_ms']:9.1f} ms  {p['name']}")
+        lines += ['', f'Top {TOP_IMPORTS} imports (cumulative / self):']
+        for i in data['imports'][:TOP_IMPORTS]:
+            lines.append(f"  {i['cumulative_ms']:9.1f} ms  {i['self_ms']:9.1f} ms  {i['module']}")
+        return '\n'.join(lines)
+
+
+def enable() -> StartupProfile:
+    global _profile
+    if _profile is None:
+        _profile = StartupProfile()
+        _profile.install()
+    return _profile
+
+
+def enabled() -> bool:
+    return _profile is not None
+
+
+def phase(name):
+    return _profile.phase(name) if _profile is not None else contextlib.nullcontext()
+
+
+def mark(name):
+    if _profile is not None:
+        _profile.mark(name)
+
+
+def finish(path: str = REPORT_PATH):
+    """Stop recording, print the report and write it as JSON; returns the dict (or None)."""
+    global _profile
+    prof, _profile = _profile, None
+    if prof is None:
+        return None
+    prof.mark('interactive')
+    prof.uninstall()
+    data = prof.as_dict()
+    print(prof.report())
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        print(f"\nStartup profile written to {path}")
+    except Exception:
+        pass
+    return data
@@ -0,0 +1,101 @@
+"""Process-wide cache of decoded monitor templates.
+
+Monitors are re-created on every rule resume and sequence item; with the cache a
+re-armed monitor costs a stat() instead of an imread/decode. Entries are keyed by
+absolute path and validated by mtime/size, and evicted least-recently-used once
+MAX_ENTRIES or MAX_BYTES is exceeded.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+
+MAX_ENTRIES = 32
+MAX_BYTES = 64 * 1024 * 1024
+
+
+class TemplateEntry:
+    """Grayscale template; scaled(s) returns (and keeps) the INTER_AREA resize
+    TemplateMatcher uses for pyramid_scale s."""
+
+    def __init__(self, path, stamp, gray):
+        self.path = path
+        self.stamp = stamp
+        self.gray = gray
+        self._scaled = {}
+        self._lock = threading.Lock()
+
+    def scaled(self, scale: float):
+        scale = float(scale)
+        if scale == 1.0:
+            return self.gray
+        with self._lock:
+            img = self._scaled.get(scale)
+            if img is None:
+                th, tw = self.gray.shape[:2]
+                img = cv2.resize(self.gray, (max(1, int(round(tw * scale))), max(1, int(round(th * scale)))), interpolation=cv2.INTER_AREA)
+                img.setflags(write=False)
+                self._scaled[scale] = img
+            return img
+
+    @property
+    def nbytes(self) -> int:
+        return self.gray.nbytes + sum(a.nbytes for a in list(self._scaled.values()))
+
+
+class TemplateCache:
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str):
+        """TemplateEntry for an image file, or None if it cannot be read."""
+        try:
+            key = os.path.abspath(path)
+            st = os.stat(key)
+        except Exception:
+            return None
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.stamp == stamp:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        gray = cv2.imread(key, cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            return None
+        gray.setflags(write=False)
+        entry = TemplateEntry(key, stamp, gray)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+        return entry
+
+    def _evict(self):
+        total = sum(e.nbytes for e in self._entries.values())
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or total > self.max_bytes):
+            _, old = self._entries.popitem(last=False)
+            total -= old.nbytes
+
+    def invalidate(self, path: str) -> None:
+        with self._lock:
+            self._entries.pop(os.path.abspath(path), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = TemplateCache()
+
+
+def template_cache() -> TemplateCache:
+    return _cache
@@ -0,0 +1,236 @@
+"""Array-backed event timeline shared by replay, editing and offline transforms.
+
+Events live in array.array columns laid out like core.action_binary:
+op, btn, flags, x, y, nx, ny, t. Key events keep the vk in x and scroll
+events keep dx/dy in x/y, so vk/dx/dy are exposed as aliases of x/y.
+"""
+import heapq
+from array import array
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from core import action_binary
+from core.action_binary import (
+    COLUMNS, OP_KEY_DOWN, OP_KEY_UP, OP_MOVE, OP_CLICK_DOWN, OP_CLICK_UP, OP_SCROLL,
+)
+from core.actions import parse_action_line
+
+
+KEY_OPS = (OP_KEY_DOWN, OP_KEY_UP)
+MOUSE_OPS = (OP_MOVE, OP_CLICK_DOWN, OP_CLICK_UP, OP_SCROLL)
+# look-ahead used by the streaming reader to repair out-of-order timestamps
+STREAM_WINDOW = 256
+
+
+class Timeline:
+    """Columnar list of (op, btn, flags, x, y, nx, ny, t) records plus the META/comment lines."""
+
+    def __init__(self, cols: Optional[Dict[str, array]] = None, meta_lines: Optional[List[str]] = None):
+        self.cols = cols if cols is not None else action_binary.new_columns()
+        self.meta_lines = list(meta_lines or [])
+
+    # construction
+    @classmethod
+    def from_lines(cls, lines) -> 'Timeline':
+        tl = cls()
+        cols = tl.cols
+        op, btn, flags = cols['op'], cols['btn'], cols['flags']
+        x, y, nx, ny, t = cols['x'], cols['y'], cols['nx'], cols['ny'], cols['t']
+        encode = action_binary.encode_line
+        for line in lines:
+            s = line.strip()
+            if not s:
+                continue
+            if s.startswith('#') or s.startswith('META '):
+                tl.meta_lines.append(s)
+                continue
+            rec = encode(s)
+            if rec is None:
+                continue
+            op.append(rec[0]); btn.append(rec[1]); flags.append(rec[2])
+            x.append(rec[3]); y.append(rec[4]); nx.append(rec[5]); ny.append(rec[6]); t.append(rec[7])
+        return tl
+
+    @classmethod
+    def from_path(cls, path: str) -> 'Timeline':
+        if action_binary.is_binary_action(path):
+            meta_lines, cols = action_binary.read_binary(path)
+            return cls(cols, meta_lines)
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_lines(f)
+
+    # sequence protocol
+    def __len__(self) -> int:
+        return len(self.cols['t'])
+
+    def __iter__(self) -> Iterator[tuple]:
+        c = self.cols
+        return zip(*(c[name] for name, _ in COLUMNS))
+
+    def __getitem__(self, idx):
+        c = self.cols
+        if isinstance(idx, slice):
+            return Timeline({name: c[name][idx] for name, _ in COLUMNS}, self.meta_lines)
+        return tuple(c[name][idx] for name, _ in COLUMNS)
+
+    def append(self, rec) -> None:
+        action_binary.append_record(self.cols, rec)
+
+    # column views
+    @property
+    def op(self) -> array:
+        return self.cols['op']
+
+    @property
+    def btn(self) -> array:
+        return self.cols['btn']
+
+    @property
+    def flags(self) -> array:
+        return self.cols['flags']
+
+    @property
+    def x(self) -> array:
+        return self.cols['x']
+
+    @property
+    def y(self) -> array:
+        return self.cols['y']
+
+    @property
+    def nx(self) -> array:
+        return self.cols['nx']
+
+    @property
+    def ny(self) -> array:
+        return self.cols['ny']
+
+    @property
+    def t(self) -> array:
+        return self.cols['t']
+
+    # aliases documented in the module docstring
+    vk = x
+    dx = x
+    dy = y
+
+    # derived data
+    @property
+    def duration_ms(self) -> int:
+        return max(self.cols['t']) if len(self) else 0
+
+    def is_sorted(self) -> bool:
+        t = self.cols['t']
+        return all(a <= b for a, b in zip(t, t[1:]))
+
+    def take(self, order) -> 'Timeline':
+        c = self.cols
+        return Timeline({name: array(tc, (c[name][i] for i in order)) for name, tc in COLUMNS}, self.meta_lines)
+
+    def sorted(self) -> 'Timeline':
+        """Stable sort by timestamp; returns self when already ordered."""
+        if self.is_sorted():
+            return self
+        t = self.cols['t']
+        return self.take(sorted(range(len(t)), key=t.__getitem__))
+
+    def shift(self, offset_ms: int) -> 'Timeline':
+        cols = {name: array(tc, self.cols[name]) for name, tc in COLUMNS}
+        cols['t'] = array('I', (max(0, v + offset_ms) for v in self.cols['t']))
+        return Timeline(cols, self.meta_lines)
+
+    def counts(self) -> Dict[str, int]:
+        names = {OP_KEY_DOWN: 'key_down', OP_KEY_UP: 'key_up', OP_MOVE: 'move',
+                 OP_CLICK_DOWN: 'click_down', OP_CLICK_UP: 'click_up', OP_SCROLL: 'scroll'}
+        out = {v: 0 for v in names.values()}
+        for op in self.cols['op']:
+            key = names.get(op)
+            if key:
+                out[key] += 1
+        return out
+
+    def meta(self, key: str) -> List[str]:
+        """Arguments of the first `META <key> ...` line, or []."""
+        for s in self.meta_lines:
+            parts = s.split()
+            if len(parts) >= 2 and parts[0] == 'META' and parts[1] == key:
+                return parts[2:]
+        return []
+
+    # text views
+    def line(self, i: int) -> str:
+        return action_binary.record_to_line(self[i])
+
+    def lines(self) -> Iterator[str]:
+        for rec in self:
+            yield action_binary.record_to_line(rec)
+
+    def rows(self) -> Iterator[Dict[str, str]]:
+        """parse_action_line()-shaped string dicts, for the editor grid."""
+        for s in self.lines():
+            yield parse_action_line(s)
+
+    def save(self, path: str, binary: bool = None) -> int:
+        if binary is None:
+            binary = path.lower().endswith(action_binary.BINARY_EXT)
+        if binary:
+            return action_binary.write_binary(path, self.meta_lines, iter(self))
+        with open(path, 'w', encoding='utf-8') as f:
+            for s in self.meta_lines:
+                f.write(s + '\n')
+            for s in self.lines():
+                f.write(s + '\n')
+        return len(self)
+
+
+# streaming
+def iter_path(path: str) -> Iterator[tuple]:
+    """Yield records in file order, reading lazily (line by line / block by block)."""
+    if action_binary.is_binary_action(path):
+        yield from action_binary.iter_records(path)
+        return
+    encode = action_binary.encode_line
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            s = line.strip()
+            if not s or s.startswith('#') or s.startswith('META '):
+                continue
+            rec = encode(s)
+            if rec is not None:
+                yield rec
+
+
+def iter_ordered(records: Iterable[tuple], window: int = STREAM_WINDOW) -> Iterator[tuple]:
+    """Yield records by timestamp through a bounded look-ahead window.
+
+    In-order input passes through a FIFO. The first record that arrives earlier than
+    the one before it turns the window into a heap (bounded merge). Anything more than
+    `window` records out of place is emitted late rather than buffering the whole file.
+    """
+    fifo = deque()
+    heap = None
+    seq = 0
+    for rec in records:
+        t = rec[7]
+        if heap is None:
+            if not fifo or t >= fifo[-1][7]:
+                fifo.append(rec)
+                if len(fifo) > window:
+                    yield fifo.popleft()
+                continue
+            # fifo is sorted, so its (t, seq) list is already a valid heap
+            heap = [(r[7], i, r) for i, r in enumerate(fifo)]
+            seq = len(heap)
+            fifo.clear()
+        heapq.heappush(heap, (t, seq, rec))
+        seq += 1
+        if len(heap) > window:
+            yield heapq.heappop(heap)[2]
+    while fifo:
+        yield fifo.popleft()
+    while heap:
+        yield heapq.heappop(heap)[2]
+
+
+def stream_path(path: str, window: int = STREAM_WINDOW) -> Iterator[tuple]:
+    return iter_ordered(iter_path(path), window)
@@ -1,6 +1,6 @@
 import time
-import ctypes
-import tkinter
+
+from core.screen import screen_geometry
 
 
 def wait_until_or_stop(until_ts: float, stop_event, quantum: float = 0.01) -> bool:
@@ -18,16 +18,5 @@ def wait_until_or_stop(until_ts: float, stop_event, quantum: float = 0.01) -> bo
 
 
 def get_screen_size():
-    try:
-        user32 = ctypes.windll.user32
-        return int(user32.GetSystemMetrics(0)), int(user32.GetSystemMetrics(1))
-    except Exception:
-        try:
-            t = tkinter.Tk()
-            w = int(t.winfo_screenwidth())
-            h = int(t.winfo_screenheight())
-            t.destroy()
-            return w, h
-        except Exception:
-            return 1920, 1080
-
+    """(width, height) of the primary screen, cached; see core.screen for invalidation."""
+    return screen_geometry().size()
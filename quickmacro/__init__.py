@@ -0,0 +1 @@
+"""Command-line entry points (`python -m quickmacro ...`); the GUI is QuickMacro.py."""
@@ -0,0 +1,350 @@
+"""Headless replay: `python -m quickmacro play <file.action|file.rule> [--repeat N] [--infinite]`.
+
+Builds the same AppService/ActionRunner/RuleEngine/ExecuteController wiring as
+ui/app.run_app, minus Tk: the few UI hooks the engine calls are replaced by
+stand-ins, timers run on threading.Timer, and events/log lines go to stdout as
+JSON lines (or plain text). F11/ESC (when a keyboard hook is available) or
+Ctrl+C stop the run. Screen size comes from --screen / QUICKMACRO_SCREEN, Win32
+or Xlib, never from a Tk root.
+
+Exit codes: 0 finished, 1 could not start, 130 stopped by hotkey or Ctrl+C.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+EXIT_OK = 0
+EXIT_START_FAILED = 1
+EXIT_INTERRUPTED = 130
+# engine events echoed to stdout
+EVENTS = ('replay_started', 'replay_done', 'replay_stopped', 'monitor_hit', 'monitor_timeout', 'monitor_image_hit')
+# how long the app must stay idle after a done/stopped event before the run counts as over
+# (the restart/resume chain and rule sequences start the next replay within this window)
+SETTLE_S = 0.5
+
+
+class _Var:
+    """Stands in for the Tk variables ExecuteController reads and writes."""
+
+    def __init__(self, value=None):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+class _Root:
+    """root.after/after_cancel on threading.Timer."""
+
+    def after(self, ms, fn):
+        t = threading.Timer(max(0, ms) / 1000.0, fn)
+        t.daemon = True
+        t.start()
+        return t
+
+    def after_cancel(self, job):
+        try:
+            job.cancel()
+        except Exception:
+            pass
+
+
+class Output:
+    def __init__(self, fmt='json', stream=None):
+        self.fmt = fmt
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def emit(self, event, **fields):
+        ts = datetime.now().isoformat(timespec='milliseconds')
+        if self.fmt == 'json':
+            line = json.dumps({'ts': ts, 'event': event, **fields}, ensure_ascii=False, default=str)
+        else:
+            extra = ' '.join(f'{k}={v}' for k, v in fields.items())
+            line = f'[{ts}] {event} {extra}'.rstrip()
+        with self._lock:
+            print(line, file=self.stream, flush=True)
+
+
+class HeadlessApp:
+    def __init__(self, qm, out: Output):
+        self.qm = qm
+        self.out = out
+        self.state = state = qm.state
+        self.finished = threading.Event()
+        self.interrupted = False
+        self._settle = None
+        state.can_start_listening = True
+        state.can_start_executing = True
+        state.ev_stop_execute_keyboard.set()
+        state.ev_stop_execute_mouse.set()
+        state.ev_stop_listen.set()
+        state.ev_infinite_replay.clear()
+        self.params = {}
+        self.refs = qm.UIRefs(
+            root=_Root(),
+            actionFileVar=_Var(''),
+            actionFileSelect=None,
+            playCount=_Var(1),
+            infiniteRepeatVar=_Var(False),
+            gameModeVar=_Var(False),
+            gameModeGainVar=_Var(1.0),
+            gameModeAutoVar=_Var(True),
+            log_event=self.log,
+            update_ui_for_state=lambda ui_state: None,
+            begin_run=self.begin_run,
+            mark_interrupted=self.mark_interrupted,
+            mark_finished=self.mark_finished,
+            recording_controller=None,
+            playback_controller=None,
+            listen_controller=None,
+            execute_controller=None,
+        )
+        self.refs.update_monitor_labels = lambda: None
+        qm.ui_refs = self.refs
+        playback = qm.PlaybackController(
+            state=state,
+            update_ui_for_state=lambda ui_state: None,
+            release_all_inputs=qm.release_all_inputs,
+            start_monitor=self.start_monitor,
+            on_progress=self.on_progress,
+            on_loop_start=self.on_loop_start,
+            logger=self.log,
+        )
+        self.refs.playback_controller = playback
+        self.service = qm.AppService(
+            state=state,
+            recording_controller=None,
+            playback_controller=playback,
+            listen_controller=None,
+            execute_controller=None,
+            start_monitor=self.start_monitor,
+            compute_action_total_ms=qm.compute_action_total_ms,
+            get_restart_timeout_ms=qm.get_restart_timeout_ms,
+            release_all_inputs=qm.release_all_inputs,
+            hooks={
+                'log_event': self.log,
+                'update_ui_for_state': lambda ui_state: None,
+                'begin_run': self.begin_run,
+                'mark_interrupted': self.mark_interrupted,
+                'mark_finished': self.mark_finished,
+                'on_monitor_hit': self.on_monitor_hit,
+            },
+            replay_params_provider=self.replay_params,
+            execute_controller_factory=lambda: qm.ExecuteController(
+                state,
+                self.refs,
+                qm.command_adapter,
+                qm.release_all_inputs,
+                on_finished=lambda: self.service.event_hub.emit('replay_done', action=state.action_file_name)
+            ),
+        )
+        qm.app_service = self.service
+        try:
+            self.service.rule_engine.set_rules(qm.load_rules())
+        except Exception:
+            pass
+        hub = self.service.event_hub
+        for name in EVENTS:
+            hub.on(name, lambda _name=name, **kw: self.out.emit(_name, **kw))
+        hub.on('replay_done', lambda **kw: self._schedule_settle())
+        hub.on('replay_stopped', lambda **kw: self._schedule_settle())
+
+    # hooks the engine calls into the UI
+    def log(self, msg):
+        self.out.emit('log', msg=str(msg))
+
+    def begin_run(self, action_path, resume=False):
+        state = self.state
+        name = os.path.basename(action_path) if action_path else ''
+        if resume:
+            state.skip_run_increment = False
+            state.current_run_action = state.current_run_action or name
+        else:
+            state.current_run_idx += 1
+            state.current_run_action = name
+        state.current_run_interrupted = False
+        self.out.emit('run_resume' if resume else 'run_start', run=state.current_run_idx, action=state.current_run_action)
+
+    def mark_interrupted(self, reason=''):
+        self.state.current_run_interrupted = True
+        self.out.emit('run_interrupted', run=self.state.current_run_idx, reason=reason)
+
+    def mark_finished(self):
+        if not self.state.current_run_interrupted:
+            self.out.emit('run_finished', run=self.state.current_run_idx, action=self.state.current_run_action)
+
+    def start_monitor(self, total_loops, total_time_s=0.0):
+        state = self.state
+        state.monitor_total_loops = max(1, int(total_loops or 1))
+        state.monitor_completed_loops = 0
+        state.monitor_loop_start_ts = time.monotonic()
+        if state.dungeon_start_ts is None:
+            state.dungeon_start_ts = time.monotonic()
+        state.monitor_total_time_s = max(0.0, float(total_time_s or 0.0))
+
+    def on_progress(self, done, total):
+        self.state.monitor_completed_loops = done
+        self.out.emit('loop_done', loop=done, total=total)
+
+    def on_loop_start(self, loop_idx, total):
+        self.state.monitor_loop_start_ts = time.monotonic()
+
+    def on_monitor_hit(self):
+        self.state.dungeon_start_ts = time.monotonic()
+
+    def replay_params(self):
+        # what the GUI reads from its widgets; ExecuteController's restart chain updates the file/count
+        params = dict(self.params)
+        params['action'] = str(self.refs.actionFileVar.get() or '').strip()
+        params['repeat'] = self.refs.playCount.get()
+        return params
+
+    # completion
+    def idle(self) -> bool:
+        state = self.state
+        rep = state.current_replayer
+        running = rep is not None and not rep.wait(0)
+        return (state.can_start_executing and not running and not state.restarting_flag
+                and not state.restart_running and not self.service.rule_engine.resume_main_pending)
+
+    def _schedule_settle(self):
+        if self.finished.is_set():
+            return
+        if self._settle is not None:
+            self._settle.cancel()
+
+        def _check():
+            if self.idle():
+                self.finished.set()
+        self._settle = threading.Timer(SETTLE_S, _check)
+        self._settle.daemon = True
+        self._settle.start()
+
+    def stop(self, reason):
+        if self.finished.is_set():
+            return
+        self.interrupted = True
+        self.finished.set()
+        self.out.emit('stop_requested', reason=reason)
+        try:
+            self.service.stop_replay()
+        except Exception:
+            pass
+
+    def start_hotkeys(self):
+        try:
+            from pynput import keyboard
+        except Exception as e:
+            self.out.emit('warning', msg=f'keyboard hook unavailable ({e}); use Ctrl+C to stop')
+            return None
+
+        def on_release(key):
+            if key in (keyboard.Key.f11, keyboard.Key.esc):
+                self.stop('hotkey')
+                return False
+        try:
+            listener = keyboard.Listener(on_release=on_release)
+            listener.daemon = True
+            listener.start()
+            return listener
+        except Exception as e:
+            self.out.emit('warning', msg=f'keyboard hook unavailable ({e}); use Ctrl+C to stop')
+            return None
+
+    def play(self, name, params, hotkeys=True) -> int:
+        self.params = dict(params)
+        if not os.path.exists(self.service._resolve_action_path(name)):
+            self.out.emit('exit', code=EXIT_START_FAILED, reason=f'file not found: {name}')
+            return EXIT_START_FAILED
+        self.refs.actionFileVar.set(name)
+        self.refs.playCount.set(params.get('repeat', 1))
+        self.refs.infiniteRepeatVar.set(bool(params.get('infinite')))
+        self.service.start_replay(self.replay_params())
+        if self.state.can_start_executing:
+            self.out.emit('exit', code=EXIT_START_FAILED, reason='replay did not start')
+            return EXIT_START_FAILED
+        listener = self.start_hotkeys() if hotkeys else None
+        try:
+            # wait with a timeout so Ctrl+C is delivered on every platform
+            while not self.finished.wait(0.5):
+                pass
+        except KeyboardInterrupt:
+            self.stop('ctrl-c')
+        try:
+            if listener is not None:
+                listener.stop()
+        except Exception:
+            pass
+        for name in ('monitor_thread', 'monitor_image_thread'):
+            try:
+                t = getattr(self.state, name, None)
+                if t is not None:
+                    t.stop()
+            except Exception:
+                pass
+        try:
+            rep = self.state.current_replayer
+            if rep is not None:
+                rep.wait(2.0)
+        except Exception:
+            pass
+        code = EXIT_INTERRUPTED if self.interrupted else EXIT_OK
+        self.out.emit('exit', code=code, runs=self.state.current_run_idx)
+        return code
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog='python -m quickmacro', description='QuickMacro headless runner')
+    sub = ap.add_subparsers(dest='command', required=True)
+    play = sub.add_parser('play', help='replay an .action/.actionb file or run a .rule file')
+    play.add_argument('file', help='file name under actions/ or a path')
+    play.add_argument('--repeat', type=int, default=1, help='loops (for .rule files: sequence cycles)')
+    play.add_argument('--infinite', action='store_true')
+    play.add_argument('--relative', action='store_true', help='game mode: inject relative mouse moves')
+    play.add_argument('--rel-gain', type=float, default=1.0)
+    play.add_argument('--no-rel-auto', action='store_true')
+    play.add_argument('--backend', default=None, help='input backend: pynput, directinput, null, batching:<name>')
+    play.add_argument('--streaming', dest='streaming', action='store_const', const=True, default=None,
+                      help='stream events from disk (default for .actionb and very long text files)')
+    play.add_argument('--no-streaming', dest='streaming', action='store_const', const=False,
+                      help='load the whole file before starting')
+    play.add_argument('--scheduler', default=None, help='replay scheduler spec, e.g. hybrid or sleep')
+    play.add_argument('--screen', metavar='WxH', default=None,
+                      help='current screen size when it cannot be probed (default 1920x1080)')
+    play.add_argument('--no-hotkeys', action='store_true', help='do not hook F11/ESC')
+    play.add_argument('--log-format', choices=('json', 'text'), default='json')
+    args = ap.parse_args(argv)
+
+    from core import screen
+    screen.set_tk_probe(False)
+    if args.screen:
+        try:
+            screen.parse_size(args.screen)
+        except ValueError:
+            ap.error(f'--screen: expected WxH, got {args.screen!r}')
+        os.environ[screen.ENV_SCREEN] = args.screen
+    import QuickMacro as qm
+    out = Output(args.log_format)
+    app = HeadlessApp(qm, out)
+    params = {
+        'repeat': max(1, args.repeat),
+        'infinite': args.infinite,
+        'use_rel': args.relative,
+        'rel_gain': args.rel_gain,
+        'rel_auto': not args.no_rel_auto,
+    }
+    if args.backend:
+        params['backend'] = args.backend
+    if args.scheduler:
+        params['scheduler'] = args.scheduler
+    if args.streaming is not None:
+        params['streaming'] = args.streaming
+    return app.play(args.file, params, hotkeys=not args.no_hotkeys)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the app runs from the repository root; make its packages importable the same way
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
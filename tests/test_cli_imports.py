@@ -0,0 +1,26 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# the headless runner must not need Tk (or a display) to replay
+SCRIPT = """
+import json, sys
+from quickmacro import cli
+from core.screen import screen_geometry
+code = cli.main(['play', sys.argv[1], '--backend', 'null', '--no-hotkeys', '--screen', '800x600'])
+print(json.dumps({'code': code, 'tkinter': 'tkinter' in sys.modules, 'size': screen_geometry().size()}))
+"""
+
+
+def test_headless_play_does_not_load_tkinter(tmp_path):
+    action = tmp_path / 'a.action'
+    action.write_text('K DOWN 65 0\nK UP 65 10\nM MOVE 10 10 20\n')
+    env = {k: v for k, v in os.environ.items() if k != 'DISPLAY'}
+    env['PYTHONPATH'] = ROOT
+    out = subprocess.run([sys.executable, '-c', SCRIPT, str(action)], cwd=str(tmp_path), env=env,
+                         capture_output=True, text=True, timeout=60)
+    assert out.returncode == 0, out.stderr
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    assert result == {'code': 0, 'tkinter': False, 'size': [800, 600]}
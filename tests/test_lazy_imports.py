@@ -0,0 +1,22 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# heavy modules that must only load on first use (or from warm_up_imports)
+HEAVY = ('cv2', 'numpy', 'pyautogui', 'pynput', 'PIL')
+
+SCRIPT = """
+import json, sys
+import QuickMacro
+import ui.app
+print(json.dumps(sorted(m for m in %r if m in sys.modules)))
+""" % (HEAVY,)
+
+
+def test_importing_app_does_not_load_heavy_modules():
+    # a fresh interpreter, so modules imported by other tests do not count
+    out = subprocess.run([sys.executable, '-c', SCRIPT], cwd=ROOT, capture_output=True, text=True, timeout=60)
+    assert out.returncode == 0, out.stderr
+    assert json.loads(out.stdout.strip().splitlines()[-1]) == []
@@ -0,0 +1,21 @@
+from core.settings import Settings, load_settings, save_settings
+
+
+def test_save_load_round_trip(tmp_path):
+    path = str(tmp_path / 'settings.json')
+    data = load_settings(path)
+    data.update(play_count=3, infinite=True, last_action='a.action', record_binary=True, warmup_imports=False)
+    save_settings(data, path)
+    assert load_settings(path) == data
+
+
+def test_warmup_opt_out_survives_resave(tmp_path):
+    # the UI re-saves starting from the stored file; the opt-out must not reset to the default
+    path = str(tmp_path / 'settings.json')
+    save_settings({'warmup_imports': False}, path)
+    data = load_settings(path)
+    data['play_count'] = 5
+    save_settings(data, path)
+    loaded = Settings.load(path)
+    assert loaded.warmup_imports is False
+    assert loaded.play_count == 5
@@ -3,7 +3,9 @@ import tkinter
 from tkinter import ttk
 import tkinter.messagebox as messagebox
 
-from core.actions import parse_action_line, compose_action_line
+from core.actions import compose_action_line
+from core.action_binary import write_action_lines
+from core.timeline import Timeline
 
 
 def resolve_action_path(name: str) -> str:
@@ -74,35 +76,21 @@ def open_action_editor(root, state, action_file_name: str, refresh_current_actio
         return set()
 
     try:
-        with open(path, 'r', encoding='utf-8') as f:
-            lines = [ln.rstrip('\n') for ln in f.readlines()]
+        timeline = Timeline.from_path(path)
     except Exception as e:
         messagebox.showerror('Error', f'Failed to open file:\n{e}')
         editor.destroy(); return
 
-    meta_lines = []
-    meta_screen = ''
-    meta_start = ''
-    data_lines = []
-    for text in lines:
-        if text.startswith('META '):
-            meta_lines.append(text)
-            parts = text.split()
-            if len(parts)>=3 and parts[1] == 'SCREEN' and len(parts)>=4:
-                meta_screen = f"{parts[2]}x{parts[3]}"
-            if len(parts)>=3 and parts[1] == 'START':
-                meta_start = parts[2]
-        elif text.startswith('#') or text.strip() == '':
-            continue
-        else:
-            data_lines.append(text)
+    meta_lines = [text for text in timeline.meta_lines if text.startswith('META ')]
+    screen = timeline.meta('SCREEN')
+    meta_screen = f"{screen[0]}x{screen[1]}" if len(screen) >= 2 else ''
+    meta_start = (timeline.meta('START') or [''])[0]
 
     meta_disp = f"Screen: {meta_screen or 'N/A'}    Start: {meta_start or 'N/A'}"
     meta_label = ttk.Label(frame_top, text=meta_disp, style='Biz.TLabel')
     meta_label.pack(anchor='w')
 
-    for idx, text in enumerate(data_lines, start=1):
-        d = parse_action_line(text)
+    for idx, d in enumerate(timeline.rows(), start=1):
         vals = [idx, d['type'], d['op'], d['vk'], d['btn'], d['act'], d['x'], d['y'], d['nx'], d['ny'], d['dx'], d['dy'], d['ms'], d['raw']]
         tree.insert('', 'end', values=tuple(vals))
 
@@ -256,10 +244,7 @@ def open_action_editor(root, state, action_file_name: str, refresh_current_actio
                 vals = {c: tree.set(i, c) for c in columns}
                 new_line = compose_action_line(vals)
                 new_lines.append(new_line)
-            with open(path, 'w', encoding='utf-8') as f:
-                if meta_lines:
-                    f.write('\n'.join(meta_lines) + '\n')
-                f.write('\n'.join(new_lines) + '\n')
+            write_action_lines(path, meta_lines + new_lines)
             if callable(refresh_current_action):
                 refresh_current_action()
             if callable(on_saved):
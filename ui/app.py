@@ -10,6 +10,10 @@ import tkinter.messagebox as messagebox
 from pathlib import Path
 from ui.components import LogPanel, MonitorPanel
 from ui.action_editor import open_action_editor as component_open_action_editor, resolve_action_path
+from core.actions import parse_action_line as action_parse_line
+from core.action_binary import write_action_lines
+from core.timeline import Timeline
+from core import startup_profile
 
 def run_app(qm):
     # bind symbols from QuickMacro module
@@ -28,12 +32,10 @@ def run_app(qm):
     select_current_action_in_dropdown = qm.select_current_action_in_dropdown
     compute_action_total_ms = qm.compute_action_total_ms
     get_restart_timeout_ms = qm.get_restart_timeout_ms if 'get_restart_timeout_ms' in vars(qm) else None
-    action_parse_line = qm.action_parse_line
     action_compose_line = qm.action_compose_line
     UiState = qm.UiState if 'UiState' in vars(qm) else qm.__dict__.get('UiState', None)
     RecordingController = qm.RecordingController
     PlaybackController = qm.PlaybackController
-    MonitorThread = qm.MonitorThread
     HotkeyController = qm.HotkeyController
     ListenController = qm.ListenController
     ExecuteController = qm.ExecuteController
@@ -48,11 +50,13 @@ def run_app(qm):
         pass
     # UAC: attempt to elevate before creating any UI (Windows)
     try:
-        relaunch_as_admin_if_needed()
+        with startup_profile.phase('admin check'):
+            relaunch_as_admin_if_needed()
     except Exception:
         pass
     # Ensure DPI awareness before creating Tk to avoid window size jumps
-    set_process_dpi_aware()
+    with startup_profile.phase('DPI awareness'):
+        set_process_dpi_aware()
 
     state.can_start_listening = True
     state.can_start_executing = True
@@ -66,7 +70,8 @@ def run_app(qm):
     state.pressed_vks = set()
     state.pressed_mouse_buttons = set()
     
-    root = tkinter.Tk()
+    with startup_profile.phase('Tk construction'):
+        root = tkinter.Tk()
     
     # Business UI theme setup
     def setup_business_theme(win):
@@ -109,7 +114,8 @@ def run_app(qm):
     
         return font_family, bg
     
-    font_family, bg_color = setup_business_theme(root)
+    with startup_profile.phase('theme setup'):
+        font_family, bg_color = setup_business_theme(root)
     ensure_assets_dir()
     ensure_actions_dir()
     
@@ -159,6 +165,11 @@ def run_app(qm):
     # start recording
     startListenerBtn = ttk.Button(recordCard, text="Start recording (F10)", command=lambda: command_adapter('listen'), style='Center.TButton')
     startListenerBtn.place(x=15, y=10, width=280, height=44)
+    # record straight to the binary .actionb format
+    recordBinaryVar = tkinter.BooleanVar()
+    recordBinaryVar.set(False)
+    recordBinaryCheck = ttk.Checkbutton(recordCard, text='Binary format (.actionb)', variable=recordBinaryVar, style='Card.TCheckbutton')
+    recordBinaryCheck.place(x=15, y=58, width=280, height=24)
     
     # times for replaying
     playCountLabel = ttk.Label(replayCard, text='Repeat Times', style='CardLabel.TLabel')
@@ -233,13 +244,18 @@ def run_app(qm):
             gain_val = float(gameModeGainVar.get())
         except Exception:
             gain_val = 1.0
+        try:
+            streaming = load_settings().get('replay_streaming')
+        except Exception:
+            streaming = None
         return {
             'action': actionFileVar.get().strip(),
             'repeat': playCount.get(),
             'infinite': bool(infiniteRepeatVar.get()),
             'use_rel': bool(gameModeVar.get()),
             'rel_gain': gain_val,
-            'rel_auto': bool(gameModeAutoVar.get())
+            'rel_auto': bool(gameModeAutoVar.get()),
+            'streaming': streaming,
         }
     def log_event(msg: str):
         log_panel.log_event(msg)
@@ -428,7 +444,8 @@ def run_app(qm):
     execute_controller = ExecuteController(state, None, command_adapter, release_all_inputs)
     
     actionFileVar = tkinter.StringVar()
-    files = list_action_files()
+    with startup_profile.phase('list_action_files'):
+        files = list_action_files()
     actionFileVar.set(files[-1] if files else '')
     
     # Action file controls inside the Replay card
@@ -455,6 +472,7 @@ def run_app(qm):
         playback_controller=playback_controller,
         listen_controller=listen_controller,
         execute_controller=execute_controller,
+        recordBinaryVar=recordBinaryVar,
     )
     listen_controller.ui_refs = qm.ui_refs
     execute_controller.ui_refs = qm.ui_refs
@@ -487,7 +505,8 @@ def run_app(qm):
         ),
     )
     try:
-        rules = qm.load_rules()
+        with startup_profile.phase('rules load'):
+            rules = qm.load_rules()
         app_service.rule_engine.set_rules(rules)
         log_event('Rules loaded.')
     except Exception:
@@ -501,8 +520,9 @@ def run_app(qm):
     
     # 加载设置并应用
     try:
-        _settings = load_settings()
-        apply_settings_to_ui(_settings)
+        with startup_profile.phase('settings load'):
+            _settings = load_settings()
+            apply_settings_to_ui(_settings)
     except Exception:
         pass
     refresh_restart_timeout_from_selection()
@@ -546,6 +566,10 @@ def run_app(qm):
             gameModeVar.trace('w', lambda *_: save_settings())
         except Exception:
             pass
+    try:
+        recordBinaryVar.trace_add('write', lambda *_: save_settings())
+    except Exception:
+        pass
     # Persist Auto toggle changes
     try:
         gameModeAutoVar.trace_add('write', lambda *_: save_settings())
@@ -679,37 +703,22 @@ def run_app(qm):
     
         # Load lines
         try:
-            with open(path, 'r', encoding='utf-8') as f:
-                lines = [ln.rstrip('\n') for ln in f.readlines()]
+            timeline = Timeline.from_path(path)
         except Exception as e:
             messagebox.showerror('Error', f'Failed to open file:\n{e}')
             editor.destroy(); return
     
         # Extract META lines for header and exclude them from the grid
-        meta_lines = []
-        meta_screen = ''
-        meta_start = ''
-        data_lines = []
-        for text in lines:
-            if text.startswith('META '):
-                meta_lines.append(text)
-                parts = text.split()
-                if len(parts)>=3 and parts[1] == 'SCREEN' and len(parts)>=4:
-                    meta_screen = f"{parts[2]}x{parts[3]}"
-                if len(parts)>=3 and parts[1] == 'START':
-                    meta_start = parts[2]
-            elif text.startswith('#') or text.strip() == '':
-                # skip comments and blank lines from grid view
-                continue
-            else:
-                data_lines.append(text)
-    
+        meta_lines = [text for text in timeline.meta_lines if text.startswith('META ')]
+        screen = timeline.meta('SCREEN')
+        meta_screen = f"{screen[0]}x{screen[1]}" if len(screen) >= 2 else ''
+        meta_start = (timeline.meta('START') or [''])[0]
+
         meta_disp = f"Screen: {meta_screen or 'N/A'}    Start: {meta_start or 'N/A'}"
         meta_label = ttk.Label(frame_top, text=meta_disp, style='Biz.TLabel')
         meta_label.pack(anchor='w')
     
-        for idx, text in enumerate(data_lines, start=1):
-            d = parse_action_line(text)
+        for idx, d in enumerate(timeline.rows(), start=1):
             vals = [idx, d['type'], d['op'], d['vk'], d['btn'], d['act'], d['x'], d['y'], d['nx'], d['ny'], d['dx'], d['dy'], d['ms'], d['raw']]
             tree.insert('', 'end', values=tuple(vals))
     
@@ -1129,11 +1138,8 @@ def run_app(qm):
                     # compose from structured fields if possible
                     new_line = compose_action_line(vals)
                     new_lines.append(new_line)
-                with open(path, 'w', encoding='utf-8') as f:
-                    # write original meta lines first
-                    if meta_lines:
-                        f.write('\n'.join(meta_lines) + '\n')
-                    f.write('\n'.join(new_lines) + '\n')
+                # write original meta lines first
+                write_action_lines(path, meta_lines + new_lines)
             except Exception as e:
                 messagebox.showerror('Error', f'Failed to save file:\n{e}')
                 return
@@ -1199,7 +1205,8 @@ def run_app(qm):
     openBtn.place(x=15, y=235, width=100, height=28)
 
     # Start hotkeys listener (F10/F11)
-    HotkeyController(state, root, lambda: command_adapter('listen'), lambda: command_adapter('execute')).start()
+    with startup_profile.phase('hotkey listener start'):
+        HotkeyController(state, root, lambda: command_adapter('listen'), lambda: command_adapter('execute')).start()
     
     # Removed Tk window key binds to avoid double-trigger; global hotkeys handle F10/F11
     
@@ -1211,6 +1218,12 @@ def run_app(qm):
             state.ev_stop_listen.set()
         except Exception:
             pass
+        try:
+            # joins the writer thread so buffered events reach the file before exit
+            if state.current_recorder:
+                state.current_recorder.stop()
+        except Exception:
+            pass
         try:
             save_settings()
         except Exception:
@@ -1222,7 +1235,19 @@ def run_app(qm):
             pass
     
     root.protocol('WM_DELETE_WINDOW', on_close)
+
+    # load OpenCV/pynput in the background once the window is showing
+    try:
+        if (load_settings() or {}).get('warmup_imports', True) and 'warm_up_imports' in vars(qm):
+            root.after(200, qm.warm_up_imports)
+    except Exception:
+        pass
     
+    if startup_profile.enabled():
+        startup_profile.mark('UI built')
+        # first idle of the main loop: the window is up and responsive
+        root.after_idle(startup_profile.finish)
+
     # run
     root.mainloop()
     
@@ -38,7 +38,9 @@ class MonitorPanel:
         self.dungeon_label = ttk.Label(parent, text='Dungeon time: 0.0s', style='CardLabel.TLabel')
         self.dungeon_label.place(x=12, y=70, width=250, height=24)
         self.restart_label = ttk.Label(parent, text='Restart time: 3600.0s', style='CardLabel.TLabel')
-        self.restart_label.place(x=280, y=70, width=260, height=24)
+        self.restart_label.place(x=280, y=70, width=240, height=24)
+        self.poll_label = ttk.Label(parent, text='Poll: -', style='CardLabel.TLabel')
+        self.poll_label.place(x=530, y=70, width=120, height=24)
 
     def update_labels(self):
         try:
@@ -55,5 +57,12 @@ class MonitorPanel:
             self.dungeon_label['text'] = f"Dungeon time: {dungeon_elapsed:.1f}s"
             restart_ms = getattr(self.state, 'restart_timeout_ms', 0) or 0
             self.restart_label['text'] = f"Restart time: {restart_ms/1000.0:.1f}s"
+            # effective polling interval of the running image monitor(s)
+            polls = []
+            for name in ('monitor_thread', 'monitor_image_thread'):
+                t = getattr(self.state, name, None)
+                if t is not None and getattr(t, 'is_alive', lambda: False)():
+                    polls.append(f"{float(getattr(t, 'interval_s', 0.0) or 0.0):.1f}")
+            self.poll_label['text'] = f"Poll: {'/'.join(polls)}s" if polls else 'Poll: -'
         except Exception:
             pass